@@ -12,6 +12,9 @@ the following command
 
 sudo python calc.py
 
+Add --profile to print a loop profile when stopped
+and save it to calc_profile.json.
+
 Author: Brandon Blodget 
 URL: https://github.com/bblodget/RaspberryPi
 
@@ -21,10 +24,16 @@ All rights reserved.
 """
 
 import digit_wall
+import loop_profiler
 import minecraft.minecraft as minecraft
 import minecraft.block as block
+import sys
 import time
-import RPi.GPIO as GPIO
+try:
+    import RPi.GPIO as GPIO
+except ImportError:
+    # not on a Pi: drive the simulated adder instead
+    import logic_sim as GPIO
 
 ####################
 # Constants
@@ -66,7 +75,7 @@ B_TYPE = 1
 ####################
 
 led_on = False
-mc = minecraft.Minecraft.create()
+mc = minecraft.Minecraft.create(reconnect=True, coalesce=True)
 a_state = [False, False, False]
 b_state = [False, False, False]
 
@@ -149,18 +158,22 @@ def draw_plus():
                  H_PLUS_LOC[0], H_PLUS_LOC[1]+2, H_PLUS_LOC[2],
                 block.GOLD_BLOCK)
 
-def run():
+def run(profiler=None):
     global mc, led_on, a_wall, b_wall
+    prof = profiler or loop_profiler.NullProfiler()
 
     #loop until Ctrl C
     try:
         while True:
-            blockHits = mc.events.pollBlockHits()
+            prof.tick()
+            blockHits = mc.events.pollBlockHits(batched=True)
+            prof.mark("poll")
             if blockHits:
                 a_wall.update(blockHits)
                 b_wall.update(blockHits)
+            prof.mark("handler")
 
-            time.sleep(0.1)
+            prof.sleep(0.1)
     except KeyboardInterrupt:
         print("stopped")
 
@@ -174,7 +187,16 @@ def main():
     time.sleep(1)
     mc.postToChat("Minecraft-pi calc.");
     setup()
-    run()
+    profiler = None
+    if "--profile" in sys.argv:
+        profiler = loop_profiler.LoopProfiler(sample_interval=0.01,
+                                              label="calc")
+        profiler.instrument(GPIO, "output", "gpio")
+    run(profiler)
+    if profiler:
+        profiler.stop_sampling()
+        print(profiler.format_report())
+        profiler.export("calc_profile.json")
 
 
 if __name__ == "__main__": main()
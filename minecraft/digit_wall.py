@@ -18,7 +18,11 @@ All rights reserved.
 """
 
 from __future__ import division
-import RPi.GPIO as GPIO
+try:
+    import RPi.GPIO as GPIO
+except ImportError:
+    # not on a Pi: drive the simulated adder instead
+    import logic_sim as GPIO
 
 
 ####################
@@ -1,7 +1,13 @@
 # Touch a block to turn on a torch and an led.
+# Add --profile to print a loop profile when stopped
+# and save it to led_profile.json.
 
+from __future__ import print_function
+
+import loop_profiler
 import minecraft.minecraft as minecraft
 import minecraft.block as block
+import sys
 import time
 import RPi.GPIO as GPIO
 
@@ -21,18 +27,24 @@ def setup():
 if __name__ == "__main__":
 
     time.sleep(2)
-    mc = minecraft.Minecraft.create()
+    mc = minecraft.Minecraft.create(reconnect=True)
     mc.postToChat("Minecraft LED, Hit (Right Click) Grass Block on Diamond floor to light torch and LED")
     setup()
+    prof = loop_profiler.NullProfiler()
+    if "--profile" in sys.argv:
+        prof = loop_profiler.LoopProfiler(sample_interval=0.01, label="led")
+        prof.instrument(GPIO, "output", "gpio")
 
     #loop until Ctrl C
     try:
         while True:
+            prof.tick()
             blockHits = mc.events.pollBlockHits()
+            prof.mark("poll")
             if blockHits:
                 for blockHit in blockHits:
                     x,y,z = blockHit.pos
-                    print x,y,z
+                    print(x, y, z)
                     if (x == -9 and z==11):
                         if (led_on):
                             GPIO.output(7,GPIO.LOW)
@@ -42,7 +54,12 @@ if __name__ == "__main__":
                             GPIO.output(7,GPIO.HIGH)
                             mc.setBlock(-9,3,11,50)
                             led_on = True;
-                            
-            time.sleep(0.1)
+            prof.mark("handler")
+
+            prof.sleep(0.1)
     except KeyboardInterrupt:
         print("stopped")
+    if "--profile" in sys.argv:
+        prof.stop_sampling()
+        print(prof.format_report())
+        prof.export("led_profile.json")
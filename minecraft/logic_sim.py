@@ -0,0 +1,349 @@
+"""
+
+File: logic_sim.py
+
+Headless logic simulation of the breadboarded adder
+used by calc.py, behind the RPi.GPIO interface.
+
+The module can stand in for RPi.GPIO:
+
+    import logic_sim as GPIO
+
+Writes to the A/B pins drive a simulated 3-bit ripple
+carry adder.  Its sum outputs change after the modeled
+gate propagation delay and can be read back with
+GPIO.input() on the SUM_PIN pins.
+
+Netlists evaluate bit-parallel: every signal is an
+integer whose bit k is its value in test vector k, so
+one pass over the gates evaluates many inputs at once.
+
+Run "python logic_sim.py" for a benchmark.
+
+"""
+
+from __future__ import division
+from __future__ import print_function
+import collections
+import time
+
+
+####################
+# Module Constants
+####################
+
+# RPi.GPIO compatible constants
+BOARD = 10
+BCM = 11
+OUT = 0
+IN = 1
+LOW = 0
+HIGH = 1
+
+# Gate propagation delay in seconds (74HC series
+# logic is around 10ns per gate)
+GATE_DELAY = 10e-9
+
+# Pins of calc.py: A_PIN, B_PIN and the adder outputs
+A_PIN = [7, 11, 13]
+B_PIN = [12, 16, 18]
+SUM_PIN = [15, 19, 21, 22]
+
+# Number of output edges remembered
+EDGE_HISTORY = 10000
+
+OPS = {
+    "AND":  lambda v, m: v[0] & v[1],
+    "OR":   lambda v, m: v[0] | v[1],
+    "XOR":  lambda v, m: v[0] ^ v[1],
+    "NAND": lambda v, m: ~(v[0] & v[1]) & m,
+    "NOR":  lambda v, m: ~(v[0] | v[1]) & m,
+    "XNOR": lambda v, m: ~(v[0] ^ v[1]) & m,
+    "NOT":  lambda v, m: ~v[0] & m,
+    "BUF":  lambda v, m: v[0],
+}
+
+
+####################
+# Classes
+####################
+
+
+class Netlist:
+    """A combinational gate netlist.  Gates must be
+    added after the gates driving their inputs."""
+
+    def __init__(self):
+        self.inputs = []
+        self.outputs = []
+        # (out, op, inputs, delay)
+        self.gates = []
+        self.signals = set()
+
+    def add_input(self, name):
+        self.inputs.append(name)
+        self.signals.add(name)
+
+    def add_gate(self, out, op, inputs, delay=GATE_DELAY):
+        for name in inputs:
+            if name not in self.signals:
+                raise ValueError("Gate %s: unknown input %s" % (out, name))
+        self.gates.append((out, OPS[op], list(inputs), delay))
+        self.signals.add(out)
+
+    def add_output(self, name):
+        if name not in self.signals:
+            raise ValueError("Unknown output %s" % name)
+        self.outputs.append(name)
+
+    def evaluate(self, inputs, width=1):
+        """ Evaluate the netlist.  inputs maps input names
+        to integers holding width test vectors, one per
+        bit.  Returns the values of all signals.
+        """
+        mask = (1 << width) - 1
+        values = dict((name, inputs.get(name, 0) & mask)
+                      for name in self.inputs)
+        for out, op, ins, delay in self.gates:
+            values[out] = op([values[i] for i in ins], mask)
+        return values
+
+    def arrival(self):
+        """ Worst case time for each signal to settle
+        after an input changes (static timing).
+        """
+        times = dict((name, 0.0) for name in self.inputs)
+        for out, op, ins, delay in self.gates:
+            times[out] = max(times[i] for i in ins) + delay
+        return times
+
+
+class Simulator:
+    """ Drives a netlist from GPIO style pin writes.
+    Output pins change after their modeled delay;
+    every change is recorded as an edge
+    (time, pin, level).
+    """
+
+    def __init__(self, netlist, pin_map, clock=time.time):
+        self.netlist = netlist
+        self.pin_map = pin_map
+        self.clock = clock
+        self.delay = netlist.arrival()
+        self.levels = dict((name, 0) for name in netlist.inputs)
+        self.edges = collections.deque(maxlen=EDGE_HISTORY)
+        # last edge per output pin: (time, level, previous level)
+        self.settle = {}
+        values = netlist.evaluate(self.levels)
+        for name in netlist.outputs:
+            self.settle[name] = (0.0, values[name], values[name])
+
+    def set_input(self, pin, level):
+        name = self.pin_map[pin]
+        level = 1 if level else 0
+        if self.levels.get(name) == level:
+            return
+        now = self.clock()
+        self.levels[name] = level
+        values = self.netlist.evaluate(self.levels)
+        for out in self.netlist.outputs:
+            t, new, old = self.settle[out]
+            if values[out] == new:
+                continue
+            if now < t and values[out] == old:
+                # changed back before the pending edge showed:
+                # the pulse is shorter than the delay and never
+                # reaches the output, so retract its edge
+                self.edges.remove((t, out, new))
+                self.settle[out] = (now, old, old)
+                continue
+            current = new if now >= t else old
+            t = now + self.delay[out]
+            self.settle[out] = (t, values[out], current)
+            self.edges.append((t, out, values[out]))
+
+    def get(self, pin):
+        name = self.pin_map[pin]
+        if name in self.levels:
+            return self.levels[name]
+        t, new, old = self.settle[name]
+        return new if self.clock() >= t else old
+
+
+####################
+# Functions
+####################
+
+
+def adder(bits, delay=GATE_DELAY):
+    """ Ripple carry adder with inputs A0.., B0..
+    and outputs S0..S<bits> (the last is the carry).
+    """
+    net = Netlist()
+    for i in range(bits):
+        net.add_input("A%d" % i)
+    for i in range(bits):
+        net.add_input("B%d" % i)
+    carry = None
+    for i in range(bits):
+        a, b = "A%d" % i, "B%d" % i
+        net.add_gate("X%d" % i, "XOR", [a, b], delay)
+        net.add_gate("G%d" % i, "AND", [a, b], delay)
+        if carry is None:
+            net.add_gate("S%d" % i, "BUF", ["X%d" % i], 0.0)
+            carry = "G%d" % i
+            continue
+        net.add_gate("S%d" % i, "XOR", ["X%d" % i, carry], delay)
+        net.add_gate("P%d" % i, "AND", ["X%d" % i, carry], delay)
+        net.add_gate("C%d" % i, "OR", ["G%d" % i, "P%d" % i], delay)
+        carry = "C%d" % i
+    net.add_gate("S%d" % bits, "BUF", [carry], 0.0)
+    for i in range(bits + 1):
+        net.add_output("S%d" % i)
+    return net
+
+
+def pack(values, bits):
+    """ Pack a list of integers into bit-parallel form:
+    one integer per bit position, bit k of it taken
+    from values[k].
+    """
+    # transpose the binary strings, MSB column first
+    rows = [format(v, "0%db" % bits)[-bits:] for v in reversed(values)]
+    columns = ["".join(c) for c in zip(*rows)]
+    return [int(c, 2) for c in reversed(columns)]
+
+
+def unpack(packed, count):
+    """Inverse of pack()"""
+    rows = [format(p, "0%db" % count)[-count:] for p in reversed(packed)]
+    values = [int("".join(r), 2) for r in zip(*rows)]
+    values.reverse()
+    return values
+
+
+def add_many(net, a_values, b_values, bits):
+    """ Evaluate the adder for many (a, b) pairs in
+    one bit-parallel pass.  Returns the sums.
+    """
+    count = len(a_values)
+    inputs = {}
+    for i, p in enumerate(pack(a_values, bits)):
+        inputs["A%d" % i] = p
+    for i, p in enumerate(pack(b_values, bits)):
+        inputs["B%d" % i] = p
+    values = net.evaluate(inputs, count)
+    return unpack([values["S%d" % i] for i in range(bits + 1)], count)
+
+
+def calc_pin_map(bits=3):
+    pin_map = {}
+    for i in range(bits):
+        pin_map[A_PIN[i]] = "A%d" % i
+        pin_map[B_PIN[i]] = "B%d" % i
+    for i in range(bits + 1):
+        pin_map[SUM_PIN[i]] = "S%d" % i
+    return pin_map
+
+
+####################
+# RPi.GPIO interface
+####################
+
+sim = Simulator(adder(3), calc_pin_map())
+_mode = None
+_setup = {}
+
+
+def use(simulator):
+    """Replace the simulated circuit"""
+    global sim
+    sim = simulator
+
+
+def setmode(mode):
+    global _mode
+    _mode = mode
+
+
+def setup(pin, direction):
+    if pin not in sim.pin_map:
+        raise ValueError("Pin %d is not connected" % pin)
+    _setup[pin] = direction
+
+
+def output(pin, value):
+    if _setup.get(pin) != OUT:
+        raise RuntimeError("Pin %d has not been set up as an OUTPUT" % pin)
+    sim.set_input(pin, value)
+
+
+def input(pin):
+    return sim.get(pin)
+
+
+def cleanup():
+    _setup.clear()
+
+
+####################
+# Benchmark
+####################
+
+
+def bench():
+    import random
+
+    # bit-parallel adder evaluation
+    bits = 16
+    count = 100000
+    net = adder(bits)
+    a = [random.getrandbits(bits) for i in range(count)]
+    b = [random.getrandbits(bits) for i in range(count)]
+    start = time.time()
+    sums = add_many(net, a, b, bits)
+    elapsed = time.time() - start
+    assert sums == [x + y for x, y in zip(a, b)]
+    print("%d-bit adder: %d additions in %.3fs" % (bits, count, elapsed))
+
+    # calc pipeline: DigitWall toggles driving the GPIO.
+    # Import ourselves by name so digit_wall and this
+    # function share one simulator when run as a script.
+    import digit_wall
+    import logic_sim as GPIO
+    digit_wall.GPIO = GPIO
+
+    class NullMinecraft:
+        def setBlock(self, *args):
+            pass
+
+        def setBlocks(self, *args):
+            pass
+
+    class Hit:
+        def __init__(self, pos):
+            self.pos = pos
+
+    GPIO.setmode(GPIO.BOARD)
+    for pin in A_PIN + B_PIN:
+        GPIO.setup(pin, GPIO.OUT)
+    mc = NullMinecraft()
+    a_wall = digit_wall.DigitWall(mc, 2, 0, 16, 57, 41, 0, A_PIN)
+    b_wall = digit_wall.DigitWall(mc, 15, 0, 16, 57, 41, 0, B_PIN)
+    hits = [Hit(loc) for loc in a_wall.bit_loc + b_wall.bit_loc]
+    count = 20000
+    start = time.time()
+    for i in range(count):
+        hit = [random.choice(hits)]
+        a_wall.update(hit)
+        b_wall.update(hit)
+    elapsed = time.time() - start
+    time.sleep(1e-6)
+    total = sum(GPIO.input(SUM_PIN[i]) << i for i in range(4))
+    assert total == a_wall.digit_value + b_wall.digit_value
+    print("calc pipeline: %d bit toggles in %.3fs (%.0f/s)" % (
+        count, elapsed, count / elapsed))
+    GPIO.cleanup()
+
+
+if __name__ == "__main__": bench()
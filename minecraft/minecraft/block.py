@@ -7,6 +7,12 @@ class Block:
     def __cmp__(self, rhs):
         return hash(self) - hash(rhs)
 
+    def __eq__(self, rhs):
+        return hash(self) == hash(rhs)
+
+    def __ne__(self, rhs):
+        return hash(self) != hash(rhs)
+
     def __hash__(self):
         return (self.id << 8) + self.data
 
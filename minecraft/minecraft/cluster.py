@@ -0,0 +1,143 @@
+from .minecraft import Minecraft, intFloor
+from multiprocessing.pool import ThreadPool
+
+""" Talks to several Minecraft Pi servers as one sharded world.
+
+    Each server may own a horizontal region (x0,z0,x1,z1), inclusive.
+    Block writes are clipped and routed to the shards they touch, servers
+    without a region are mirrors and receive every write. Everything else
+    is broadcast. Servers are called concurrently, one thread per server,
+    so a broadcast takes about as long as the slowest server.
+
+    Example:
+        cluster = MinecraftCluster.create([
+            ("pi1", 4711, (-128, -128, -1, 127)),
+            ("pi2", 4711, (0, -128, 127, 127))])
+        cluster.setBlocks(-10, 0, -10, 10, 0, 10, block.STONE)
+        cluster.postToChat("Hello, cluster!")"""
+
+
+class MinecraftCluster:
+    """Fan-out facade over several Minecraft instances"""
+    def __init__(self, minecrafts, regions=None):
+        self.minecrafts = list(minecrafts)
+        if regions is None:
+            regions = [None] * len(self.minecrafts)
+        self.regions = list(regions)
+        self.pool = ThreadPool(max(1, len(self.minecrafts)))
+
+    def close(self):
+        self.pool.close()
+        self.pool.join()
+
+    def _call(self, name, targets):
+        """Call name(*args) on [(minecraft, args)] targets concurrently"""
+        if len(targets) == 1:
+            mc, a = targets[0]
+            return [_callPath(mc, name, a)]
+        return self.pool.map(lambda t: _callPath(t[0], name, t[1]), targets)
+
+    def broadcast(self, name, *args):
+        """Call a method on every server, e.g. broadcast("player.setPos",
+        0,10,0). Returns the results in server order"""
+        return self._call(name, [(mc, args) for mc in self.minecrafts])
+
+    gather = broadcast
+
+    def shardsFor(self, x0, z0, x1, z1):
+        """[(minecraft, clipped region)] for the servers touching a region"""
+        x0, x1 = min(x0, x1), max(x0, x1)
+        z0, z1 = min(z0, z1), max(z0, z1)
+        shards = []
+        for mc, r in zip(self.minecrafts, self.regions):
+            if r is None:
+                shards.append((mc, (x0, z0, x1, z1)))
+                continue
+            cx0, cz0 = max(x0, r[0]), max(z0, r[1])
+            cx1, cz1 = min(x1, r[2]), min(z1, r[3])
+            if cx0 <= cx1 and cz0 <= cz1:
+                shards.append((mc, (cx0, cz0, cx1, cz1)))
+        return shards
+
+    def setBlock(self, *args):
+        """Set block (x,y,z,id,[data]) on the owning shards"""
+        args = intFloor(args)
+        x, z = args[0], args[2]
+        targets = [(mc, args) for mc, r in self.shardsFor(x, z, x, z)]
+        if targets:
+            self._call("setBlock", targets)
+
+    def setBlocks(self, *args):
+        """Set a cuboid of blocks (x0,y0,z0,x1,y1,z1,id,[data]), clipped
+        to each shard"""
+        args = intFloor(args)
+        x0, y0, z0, x1, y1, z1 = args[:6]
+        rest = args[6:]
+        targets = [(mc, [r[0], y0, r[1], r[2], y1, r[3]] + rest)
+                   for mc, r in self.shardsFor(x0, z0, x1, z1)]
+        if targets:
+            self._call("setBlocks", targets)
+
+    def setBlocksMany(self, cuboids):
+        """Set several cuboids [(x0,y0,z0,x1,y1,z1,id,[data])], clipped to
+        each shard and sent as one batch per server"""
+        batches = [[] for mc in self.minecrafts]
+        for c in cuboids:
+            c = intFloor(c)
+            x0, y0, z0, x1, y1, z1 = c[:6]
+            for mc, r in self.shardsFor(x0, z0, x1, z1):
+                batches[self.minecrafts.index(mc)].append(
+                    [r[0], y0, r[1], r[2], y1, r[3]] + c[6:])
+        targets = [(mc, [batch]) for mc, batch in zip(self.minecrafts, batches)
+                   if batch]
+        if targets:
+            self._call("setBlocksMany", targets)
+
+    def getBlock(self, *args):
+        """Get block (x,y,z) from the first shard owning it => id:int"""
+        args = intFloor(args)
+        shards = self.shardsFor(args[0], args[2], args[0], args[2])
+        if not shards:
+            raise ValueError("No shard owns %d,%d"%(args[0], args[2]))
+        return shards[0][0].getBlock(args)
+
+    def getHeight(self, *args):
+        """Get the height of the world (x,z) from the owning shard => int"""
+        args = intFloor(args)
+        shards = self.shardsFor(args[0], args[1], args[0], args[1])
+        if not shards:
+            raise ValueError("No shard owns %d,%d"%(args[0], args[1]))
+        return shards[0][0].getHeight(args)
+
+    def postToChat(self, msg):
+        self.broadcast("postToChat", msg)
+
+    def saveCheckpoint(self):
+        self.broadcast("saveCheckpoint")
+
+    def restoreCheckpoint(self):
+        self.broadcast("restoreCheckpoint")
+
+    def setting(self, setting, status):
+        self.broadcast("setting", setting, status)
+
+    @staticmethod
+    def create(servers):
+        """Connect to [(address, port, [region])] in parallel"""
+        servers = [tuple(s) for s in servers]
+        pool = ThreadPool(max(1, len(servers)))
+        try:
+            minecrafts = pool.map(lambda s: Minecraft.create(s[0], s[1]),
+                                  servers)
+        finally:
+            pool.close()
+        regions = [s[2] if len(s) > 2 else None for s in servers]
+        return MinecraftCluster(minecrafts, regions)
+
+
+def _callPath(mc, name, args):
+    """Call a dotted method path like "player.setPos" on a Minecraft"""
+    obj = mc
+    for attr in name.split("."):
+        obj = getattr(obj, attr)
+    return obj(*args)
@@ -1,50 +1,761 @@
+import atexit
 import socket
 import select
 import sys
-from util import flatten_parameters_to_string
+import time
+import threading
+import weakref
+from collections import deque, OrderedDict
+from .util import flatten, Iterable
 
 """ @author: Aron Nieminen, Mojang AB"""
 
+try:
+    _textType = unicode
+except NameError:
+    _textType = str
+
+def _text(b):
+    """bytes from the wire => str"""
+    return b if str is bytes else bytes(b).decode("utf-8", "replace")
+
+_names = {}
+# wire form of small ints, so common coordinates and ids need no new object
+_ints = [b"%d"%i for i in range(-1024, 1024)]
+
+def _encodeValues(buf, values):
+    """Appends each value followed by a comma"""
+    for v in values:
+        t = type(v)
+        if t is int or t is float and v.is_integer():
+            v = int(v)
+            buf += _ints[v + 1024] if -1024 <= v < 1024 else b"%d"%v
+        elif t is list or t is tuple:
+            _encodeValues(buf, v)
+            continue
+        elif t is bytes:
+            buf += v
+        elif isinstance(v, _textType):
+            buf += v.encode("utf-8")
+        elif isinstance(v, Iterable):
+            _encodeValues(buf, flatten(v))
+            continue
+        else:
+            v = str(v)
+            buf += v if isinstance(v, bytes) else v.encode("utf-8")
+        buf.append(44)
+
+def encodeCall(buf, f, data):
+    """Appends the wire form of f(data...) plus a newline to a bytearray.
+    Integral floats are sent without the ".0" """
+    name = _names.get(f)
+    if name is None:
+        name = _names[f] = (f + "(").encode("utf-8")
+    buf += name
+    start = len(buf)
+    _encodeValues(buf, data)
+    if len(buf) > start:
+        # replace the comma after the last value
+        buf[-1] = 41
+        buf.append(10)
+    else:
+        buf += b")\n"
+
+
 class RequestError(Exception):
     pass
 
 class Connection:
-    """Connection to a Minecraft Pi game"""
+    """Connection to a Minecraft Pi game.
+
+    Commands are encoded straight into a reusable bytearray and replies
+    are split out of a receive buffer as bytes. receive()/sendReceive()
+    return str; the *Bytes variants skip the decoding"""
     RequestFailed = "Fail"
+    RequestFailedBytes = b"Fail"
 
     def __init__(self, address, port):
         self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         self.socket.connect((address, port))
-        self.lastSent = ""
+        self._initBuffers()
+
+    def _initBuffers(self):
+        self.writeBuffer = bytearray()
+        self.readBuffer = bytearray()
+        self.readChunk = bytearray(65536)
+        # the last write, until the next one reuses the buffer
+        self.lastSent = self.writeBuffer
 
     def drain(self):
         """Drains the socket of incoming data"""
         while True:
-            readable, _, _ = select.select([self.socket], [], [], 0.0)
-            if not readable:
-                break
-            data = self.socket.recv(1500)
-            e =  "Drained Data: <%s>\n"%data.strip()
-            e += "Last Message: <%s>\n"%self.lastSent.strip()
+            if self.readBuffer:
+                data = bytes(self.readBuffer)
+                del self.readBuffer[:]
+            else:
+                readable, _, _ = select.select([self.socket], [], [], 0.0)
+                if not readable:
+                    break
+                n = self.socket.recv_into(self.readChunk)
+                if not n:
+                    raise socket.error("Connection closed by server")
+                data = bytes(self.readChunk[:n])
+            e =  "Drained Data: <%s>\n"%_text(data).strip()
+            e += "Last Message: <%s>\n"%_text(self.lastSent).strip()
             sys.stderr.write(e)
 
+    def _write(self, buf):
+        """Sends the bytes in buf, the rest of a partial send in
+        memoryview slices"""
+        sent = self.socket.send(buf)
+        if sent < len(buf):
+            view = memoryview(buf)
+            while sent < len(buf):
+                sent += self.socket.send(view[sent:])
+
     def send(self, f, *data):
         """Sends data. Note that a trailing newline '\n' is added here"""
-        s = "%s(%s)\n"%(f, flatten_parameters_to_string(data))
-        #print "f,data:",f,data
-        #print "s",s
         self.drain()
-        self.lastSent = s
-        self.socket.sendall(s)
+        buf = self.writeBuffer
+        del buf[:]
+        encodeCall(buf, f, data)
+        self._write(buf)
+
+    def sendMany(self, calls):
+        """Sends several calls [(f, data...)] in a single write"""
+        if not calls:
+            return
+        self.drain()
+        buf = self.writeBuffer
+        del buf[:]
+        for c in calls:
+            encodeCall(buf, c[0], c[1:])
+        self._write(buf)
+
+    def _readLine(self):
+        """Next line from the receive buffer, without the newline => bytes"""
+        buf = self.readBuffer
+        start = 0
+        while True:
+            i = buf.find(b"\n", start)
+            if i >= 0:
+                line = memoryview(buf)[:i].tobytes()
+                del buf[:i+1]
+                return line
+            start = len(buf)
+            n = self.socket.recv_into(self.readChunk)
+            if not n:
+                raise socket.error("Connection closed by server")
+            buf += memoryview(self.readChunk)[:n]
+
+    def receiveBytes(self):
+        """Receives a reply => bytes, without the trailing newline"""
+        s = self._readLine()
+        if s == Connection.RequestFailedBytes:
+            raise RequestError("%s failed"%_text(self.lastSent).strip())
+        return s
 
     def receive(self):
         """Receives data. Note that the trailing newline '\n' is trimmed"""
-        s = self.socket.makefile("r").readline().rstrip("\n")
-        if s == Connection.RequestFailed:
-            raise RequestError("%s failed"%self.lastSent.strip())
-        return s
+        return _text(self.receiveBytes())
 
     def sendReceive(self, *data):
         """Sends and receive data"""
         self.send(*data)
         return self.receive()
+
+    def sendReceiveBytes(self, *data):
+        """Sends and receive data => bytes"""
+        self.send(*data)
+        return self.receiveBytes()
+
+    def sendReceiveMany(self, calls):
+        """Pipelines several requests [(f, data...)] => [reply:bytes]
+
+        All requests go out in one write, then the replies are read back
+        in order. Every reply is read before a failure is raised, so the
+        stream stays in step with the server."""
+        self.sendMany(calls)
+        replies = [self._readLine() for c in calls]
+        if Connection.RequestFailedBytes in replies:
+            failed = calls[replies.index(Connection.RequestFailedBytes)]
+            raise RequestError("%s failed"%failed[0])
+        return replies
+
+
+class ResilientConnection(Connection):
+    """Connection that connects on first use and reconnects after drops.
+
+    Commands sent since the last reply are kept (up to maxBuffered) and
+    replayed after a reconnect, since the server may not have processed
+    them. A reply acknowledges every command sent before its request.
+    Connection attempts back off exponentially from backoff up to
+    maxBackoff seconds; retries=None keeps trying forever."""
+
+    def __init__(self, address, port, retries=None, backoff=0.5,
+                 maxBackoff=10.0, maxBuffered=100000):
+        self.address = address
+        self.port = port
+        self.retries = retries
+        self.backoff = backoff
+        self.maxBackoff = maxBackoff
+        self.socket = None
+        self._initBuffers()
+        # [line, isQuery] of commands the server hasn't acknowledged
+        self.unacked = deque(maxlen=maxBuffered)
+
+    def connect(self):
+        """(Re)connects, retrying with backoff, and replays unacked commands"""
+        self.close()
+        delay = self.backoff
+        attempt = 0
+        while True:
+            try:
+                sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+                sock.connect((self.address, self.port))
+                if self.unacked:
+                    sock.sendall(b"".join([e[0] for e in self.unacked]))
+                break
+            except socket.error as e:
+                sock.close()
+                attempt += 1
+                if self.retries is not None and attempt > self.retries:
+                    raise
+                sys.stderr.write("Connecting to %s:%d failed (%s), "
+                                 "retrying in %.1fs\n"%(
+                                     self.address, self.port, e, delay))
+                time.sleep(delay)
+                delay = min(delay * 2, self.maxBackoff)
+        self.socket = sock
+
+    def close(self):
+        if self.socket is not None:
+            try:
+                self.socket.close()
+            except socket.error:
+                pass
+        self.socket = None
+        del self.readBuffer[:]
+
+    def _send(self, calls, isQuery):
+        if self.socket is None:
+            self.connect()
+        buf = self.writeBuffer
+        del buf[:]
+        for c in calls:
+            start = len(buf)
+            encodeCall(buf, c[0], c[1:])
+            self.unacked.append([bytes(buf[start:]), isQuery])
+        try:
+            self.drain()
+            self._write(buf)
+        except socket.error:
+            # unacked holds these calls as well, connect() sends them again
+            self.connect()
+
+    def _readLine(self):
+        while True:
+            if self.socket is None:
+                self.connect()
+            try:
+                line = Connection._readLine(self)
+                break
+            except socket.error:
+                # dropped: the request is still unacked and gets replayed
+                self.connect()
+        while self.unacked:
+            if self.unacked.popleft()[1]:
+                break
+        return line
+
+    def send(self, f, *data):
+        self._send([(f,) + data], False)
+
+    def sendMany(self, calls):
+        self._send(calls, False)
+
+    def sendReceive(self, f, *data):
+        self._send([(f,) + data], True)
+        return self.receive()
+
+    def sendReceiveBytes(self, f, *data):
+        self._send([(f,) + data], True)
+        return self.receiveBytes()
+
+    def sendReceiveMany(self, calls):
+        self._send(calls, True)
+        replies = [self._readLine() for c in calls]
+        if Connection.RequestFailedBytes in replies:
+            failed = calls[replies.index(Connection.RequestFailedBytes)]
+            raise RequestError("%s failed"%failed[0])
+        return replies
+
+
+class _Request:
+    """A query waiting for its reply in a SharedConnection"""
+    __slots__ = ("f", "reply", "error", "done", "event")
+
+    def __init__(self, f):
+        self.f = f
+        self.reply = None
+        self.error = None
+        self.done = False
+        self.event = threading.Event()
+
+
+class SharedConnection(Connection):
+    """Connection that many threads can use at once.
+
+    Commands are encoded into a shared outgoing buffer under a short
+    lock; whichever thread finds no write in progress sends everything
+    queued so far, so writes from several threads go out together.
+    Queries are queued in the order their bytes enter the buffer, and
+    replies, which the server sends in request order, are handed out in
+    that order. One waiting thread at a time reads the socket and passes
+    the others their replies (leader/follower). The socket is never
+    drained, since unread data belongs to a waiting thread."""
+
+    def __init__(self, address, port):
+        Connection.__init__(self, address, port)
+        # writes are batched here, don't let Nagle delay them further
+        self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        # guards outgoing, spare, flushing and waiting
+        self.lock = threading.Lock()
+        self.readLock = threading.Lock()
+        self.outgoing = bytearray()
+        self.spare = bytearray()
+        self.flushing = False
+        self.waiting = deque()
+
+    def _flush(self):
+        """Send the outgoing buffer unless another thread is sending it"""
+        while True:
+            with self.lock:
+                if self.flushing or not self.outgoing:
+                    return
+                self.flushing = True
+                buf = self.outgoing
+                self.outgoing = self.spare
+                self.lastSent = buf
+            try:
+                self._write(buf)
+            finally:
+                with self.lock:
+                    self.spare = buf
+                    del buf[:]
+                    self.flushing = False
+
+    def send(self, f, *data):
+        with self.lock:
+            encodeCall(self.outgoing, f, data)
+        self._flush()
+
+    def sendMany(self, calls):
+        with self.lock:
+            for c in calls:
+                encodeCall(self.outgoing, c[0], c[1:])
+        self._flush()
+
+    def _await(self, request):
+        while not request.done:
+            if self.readLock.acquire(False):
+                try:
+                    self._readReplies(request)
+                finally:
+                    self.readLock.release()
+                # let the thread owning the oldest request read next
+                with self.lock:
+                    head = self.waiting[0] if self.waiting else None
+                if head is not None:
+                    head.event.set()
+            else:
+                request.event.wait()
+                request.event.clear()
+        if request.error is not None:
+            raise request.error
+        if request.reply == Connection.RequestFailedBytes:
+            raise RequestError("%s failed"%request.f)
+        return request.reply
+
+    def _readReplies(self, request):
+        """Read replies, handing each to its request, until request is done"""
+        try:
+            while not request.done:
+                line = self._readLine()
+                with self.lock:
+                    r = self.waiting.popleft()
+                r.reply = line
+                r.done = True
+                r.event.set()
+        except Exception as e:
+            with self.lock:
+                failed = list(self.waiting)
+                self.waiting.clear()
+            for r in failed:
+                r.error = e
+                r.done = True
+                r.event.set()
+
+    def sendReceiveBytes(self, f, *data):
+        request = _Request(f)
+        with self.lock:
+            encodeCall(self.outgoing, f, data)
+            self.waiting.append(request)
+        self._flush()
+        return self._await(request)
+
+    def sendReceive(self, f, *data):
+        return _text(self.sendReceiveBytes(f, *data))
+
+    def receiveBytes(self):
+        raise RequestError("SharedConnection replies only via sendReceive")
+
+    def sendReceiveMany(self, calls):
+        requests = [_Request(c[0]) for c in calls]
+        with self.lock:
+            for c in calls:
+                encodeCall(self.outgoing, c[0], c[1:])
+            self.waiting.extend(requests)
+        self._flush()
+        replies = [self._await(r) for r in requests]
+        return replies
+
+
+def _overlaps(a, b):
+    """Whether two normalized cuboids (x0,y0,z0,x1,y1,z1) intersect"""
+    return (a[0] <= b[3] and b[0] <= a[3] and a[1] <= b[4] and
+            b[1] <= a[4] and a[2] <= b[5] and b[2] <= a[5])
+
+
+def _flushAtExit(ref):
+    conn = ref()
+    if conn is not None:
+        conn._flushAtExit()
+
+
+class CoalescingConnection:
+    """Coalesces block writes in front of another connection.
+
+    world.setBlock/setBlocks are kept pending, keyed by the block or
+    cuboid they write; a later write to the same key replaces the earlier
+    one (last write wins). The net writes go out as one batch once window
+    seconds have passed since the first pending write, on flush() or
+    close(), at exit (with a single connection attempt), or before any
+    query, so queries always see earlier writes. Any other command is a
+    barrier: pending writes are sent first and the command goes out right
+    after them, so e.g. a checkpoint saved between two writes holds the
+    first one.
+
+    A key that was written more than once in a window and ends up with
+    the value it had at the last flush is dropped altogether, e.g. an
+    erase followed by a redraw. Such no-op pairs are only detected
+    against our own writes since the last other world command (such as a
+    checkpoint restore); blocks changed by players are not seen."""
+
+    BlockCommands = ("world.setBlock", "world.setBlocks")
+
+    def __init__(self, conn, window=0.005):
+        self.conn = conn
+        self.window = window
+        # key => [f, args, value, overwritten]
+        self.pending = OrderedDict()
+        self.pendingSince = None
+        # key => value of our last flushed write to it
+        self.known = {}
+        self.knownCuboids = set()
+        self.lock = threading.RLock()
+        self.timer = None
+        self.closed = False
+        # the timer thread is a daemon, so flush what is left at exit.
+        # Only a weak reference is registered, so this doesn't keep us alive
+        atexit.register(_flushAtExit, weakref.ref(self))
+
+    def __getattr__(self, name):
+        return getattr(self.conn, name)
+
+    def _queue(self, f, data):
+        args = list(flatten(data))
+        if f == "world.setBlock":
+            key = tuple(args[:3]) * 2
+            value = tuple(args[3:])
+        else:
+            key = (min(args[0], args[3]), min(args[1], args[4]),
+                   min(args[2], args[5]), max(args[0], args[3]),
+                   max(args[1], args[4]), max(args[2], args[5]))
+            value = tuple(args[6:])
+        if len(value) == 1:
+            value += (0,)
+        old = self.pending.pop(key, None)
+        self.pending[key] = [f, args, value, old is not None]
+
+    def _schedule(self):
+        now = time.time()
+        if self.pendingSince is None:
+            self.pendingSince = now
+            self.timer = threading.Timer(self.window, self.flush)
+            self.timer.daemon = True
+            self.timer.start()
+        elif now - self.pendingSince >= self.window:
+            self.flush()
+
+    def _barrier(self, calls):
+        """Send non-block commands after all pending writes"""
+        self.flush()
+        self.conn.sendMany(calls)
+        if [c for c in calls if c[0].startswith("world.")]:
+            # e.g. a checkpoint restore: our writes are no longer known
+            self.known.clear()
+            self.knownCuboids.clear()
+
+    def send(self, f, *data):
+        self.sendMany([(f,) + data])
+
+    def sendMany(self, calls):
+        with self.lock:
+            others = []
+            for c in calls:
+                if c[0] in CoalescingConnection.BlockCommands:
+                    if others:
+                        self._barrier(others)
+                        others = []
+                    self._queue(c[0], c[1:])
+                else:
+                    others.append(c)
+            if others:
+                self._barrier(others)
+            elif self.pending:
+                self._schedule()
+
+    def flush(self):
+        """Send the net result of all pending writes"""
+        with self.lock:
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+            self.pendingSince = None
+            if not self.pending:
+                return
+            calls = []
+            written = []
+            for key, (f, args, value, overwritten) in self.pending.items():
+                point = key[:3] == key[3:]
+                if overwritten and self.known.get(key) == value:
+                    # a point only overlaps other points with the same key
+                    earlier = [k for k, v in written
+                               if not point or k[:3] != k[3:]]
+                    if not [k for k in earlier if _overlaps(key, k)]:
+                        continue
+                calls.append((f, args))
+                written.append((key, value))
+            if calls:
+                # pending is only dropped once the batch is sent, so a
+                # failed send is retried by the next flush
+                self.conn.sendMany(calls)
+            self.pending.clear()
+            if len(self.known) > 100000:
+                self.known.clear()
+                self.knownCuboids.clear()
+            for key, value in written:
+                self._forget(key)
+                self.known[key] = value
+                if key[:3] != key[3:]:
+                    self.knownCuboids.add(key)
+
+    def close(self):
+        """Flush pending writes and close the connection"""
+        self.flush()
+        self.closed = True
+        if hasattr(self.conn, "close"):
+            self.conn.close()
+
+    def _flushAtExit(self):
+        """Flush with a single connection attempt, so a reconnecting
+        connection to a server that is down can't hold up the exit"""
+        with self.lock:
+            if self.closed or not self.pending:
+                return
+            if getattr(self.conn, "retries", 0) != 0:
+                self.conn.retries = 0
+            try:
+                self.flush()
+            except Exception as e:
+                sys.stderr.write("%d pending block writes lost at exit (%s)\n"%(
+                    len(self.pending), e))
+
+    def _forget(self, key):
+        """Drop known values that a write to key may change"""
+        if key[:3] == key[3:]:
+            stale = [k for k in self.knownCuboids if _overlaps(key, k)]
+        else:
+            stale = [k for k in self.known if _overlaps(key, k)]
+        for k in stale:
+            del self.known[k]
+            self.knownCuboids.discard(k)
+
+    def sendReceive(self, *data):
+        with self.lock:
+            self.flush()
+            return self.conn.sendReceive(*data)
+
+    def sendReceiveBytes(self, *data):
+        with self.lock:
+            self.flush()
+            return self.conn.sendReceiveBytes(*data)
+
+    def sendReceiveMany(self, calls):
+        with self.lock:
+            self.flush()
+            return self.conn.sendReceiveMany(calls)
+
+
+def benchSend(commands=100000):
+    """Compare the str formatting send path of the original client with
+    the bytearray path: wire bytes, time and temporary memory per command.
+    Run with "python -m minecraft.connection" from the minecraft folder"""
+    from .util import flatten_parameters_to_string
+    try:
+        import tracemalloc
+    except ImportError:
+        tracemalloc = None
+
+    calls = [("world.setBlock", i % 100, 0, i % 50, 41) if i % 2 else
+             ("player.setPos", float(i % 100), 64.0, float(-i % 50))
+             for i in range(commands)]
+
+    def sink(sock, counter):
+        while True:
+            data = sock.recv(65536)
+            if not data:
+                return
+            counter[0] += len(data)
+
+    def temporary(encodeAll):
+        """Peak memory while encoding all calls into one payload, less the
+        payload itself => bytes per command"""
+        if tracemalloc is None:
+            return float("nan")
+        tracemalloc.start()
+        payload = encodeAll()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return (peak - len(payload)) / float(commands)
+
+    def run(name, sendCall, encodeAll):
+        a, b = socket.socketpair()
+        counter = [0]
+        t = threading.Thread(target=sink, args=(b, counter))
+        t.start()
+        start = time.time()
+        for c in calls:
+            sendCall(a, c)
+        elapsed = time.time() - start
+        a.close()
+        t.join()
+        b.close()
+        print("%-10s %5.1f bytes/cmd %6.2fus/cmd %6.1f temp bytes/cmd"%(
+            name, counter[0] / float(commands), elapsed * 1e6 / commands,
+            temporary(encodeAll)))
+
+    def strSend(sock, c):
+        s = "%s(%s)\n"%(c[0], flatten_parameters_to_string(c[1:]))
+        sock.sendall(s.encode("utf-8"))
+
+    def strEncodeAll():
+        return "".join(["%s(%s)\n"%(c[0], flatten_parameters_to_string(c[1:]))
+                        for c in calls]).encode("utf-8")
+
+    buf = bytearray()
+    def bytesSend(sock, c):
+        del buf[:]
+        encodeCall(buf, c[0], c[1:])
+        sent = sock.send(buf)
+        if sent < len(buf):
+            view = memoryview(buf)
+            while sent < len(buf):
+                sent += sock.send(view[sent:])
+
+    def bytesEncodeAll():
+        out = bytearray()
+        for c in calls:
+            encodeCall(out, c[0], c[1:])
+        return out
+
+    run("str", strSend, strEncodeAll)
+    run("bytearray", bytesSend, bytesEncodeAll)
+
+
+def stressSharedConnection(threads=16, operations=2000):
+    """Hammer one SharedConnection from many threads mixing setBlock,
+    getBlock and pollBlockHits against a small local server, and check
+    every thread got its own replies in order"""
+    from .minecraft import Minecraft
+
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.bind(("127.0.0.1", 0))
+    server.listen(1)
+
+    def serve():
+        client, _ = server.accept()
+        world = {}
+        replies = bytearray()
+        buf = b""
+        while True:
+            data = client.recv(65536)
+            if not data:
+                break
+            buf += data
+            lines = buf.split(b"\n")
+            buf = lines.pop()
+            for line in lines:
+                f, args = line[:-1].split(b"(")
+                args = args.split(b",")
+                if f == b"world.setBlock":
+                    world[tuple(args[:3])] = args[3]
+                elif f == b"world.getBlock":
+                    replies += world.get(tuple(args), b"0") + b"\n"
+                elif f == b"events.block.hits":
+                    replies += b"1,2,3,4,5|6,7,8,9,10\n"
+            if replies:
+                client.sendall(replies)
+                del replies[:]
+        client.close()
+
+    t = threading.Thread(target=serve)
+    t.daemon = True
+    t.start()
+    mc = Minecraft(SharedConnection("127.0.0.1", server.getsockname()[1]))
+    errors = []
+
+    def worker(k):
+        try:
+            for i in range(operations):
+                y, z = i % 64, i // 64
+                mc.setBlock(k, y, z, i % 256)
+                if mc.getBlock(k, y, z) != i % 256:
+                    raise AssertionError("thread %d: wrong reply"%k)
+                if i % 10 == 0:
+                    hits = mc.events.pollBlockHits()
+                    if [h.face for h in hits] != [4, 9]:
+                        raise AssertionError("thread %d: wrong hits"%k)
+        except Exception as e:
+            errors.append(e)
+
+    workers = [threading.Thread(target=worker, args=(k,))
+               for k in range(threads)]
+    start = time.time()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    elapsed = time.time() - start
+    mc.conn.socket.close()
+    server.close()
+    if errors:
+        raise errors[0]
+    queries = threads * operations * 11 // 10
+    print("%d threads: %d queries in %.2fs, all replies matched"%(
+        threads, queries, elapsed))
+
+if __name__ == "__main__":
+    benchSend()
+    stressSharedConnection()
@@ -1,4 +1,5 @@
-from vec3 import Vec3
+from .vec3 import Vec3
+from array import array
 
 class BlockEvent:
     """An Event related to blocks (e.g. placed, removed, hit)"""
@@ -21,3 +22,76 @@ class BlockEvent:
     @staticmethod
     def Hit(x, y, z, face, entityId):
         return BlockEvent(BlockEvent.HIT, x, y, z, face, entityId)
+
+
+class BlockEventArray:
+    """Block hit events parsed into one flat array of ints, five per event
+    (x, y, z, face, entityId). BlockEvents are only created when the
+    array is indexed or iterated"""
+    FIELDS = 5
+
+    def __init__(self, data=None):
+        self.data = data if data is not None else array("i")
+
+    @staticmethod
+    def parse(s):
+        """Parse an events.block.hits reply "x,y,z,face,id|..." (bytes or
+        str) in one pass"""
+        bar, comma = (b"|", b",") if isinstance(s, bytes) else ("|", ",")
+        s = s.strip(bar)
+        if not s:
+            return BlockEventArray()
+        fields = s.replace(bar, comma).split(comma)
+        return BlockEventArray(array("i", map(int, fields)))
+
+    def __len__(self):
+        return len(self.data) // BlockEventArray.FIELDS
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("BlockEventArray index out of range")
+        d = self.data
+        k = i * BlockEventArray.FIELDS
+        return BlockEvent.Hit(d[k], d[k+1], d[k+2], d[k+3], d[k+4])
+
+    def __iter__(self):
+        d = self.data
+        for k in range(0, len(d), BlockEventArray.FIELDS):
+            yield BlockEvent.Hit(d[k], d[k+1], d[k+2], d[k+3], d[k+4])
+
+    def column(self, field):
+        """All values of one field (0=x .. 4=entityId) => array"""
+        return self.data[field::BlockEventArray.FIELDS]
+
+    def __repr__(self):
+        return "BlockEventArray(%d events)"%len(self)
+
+
+def benchParseBlockHits(events=10000, repeat=20):
+    """Compare parsing an events.block.hits reply into a list of
+    BlockEvents with parsing it into a BlockEventArray.
+    Run with "python -m minecraft.event" from the minecraft folder"""
+    import time
+    s = "|".join(["%d,%d,%d,%d,%d"%(i % 256, i % 64, -i % 256, i % 6, 1)
+                  for i in range(events)]).encode("ascii")
+
+    start = time.time()
+    for r in range(repeat):
+        hits = [BlockEvent.Hit(*map(int, e.split(b",")))
+                for e in s.split(b"|") if e]
+    listTime = (time.time() - start) / repeat
+
+    start = time.time()
+    for r in range(repeat):
+        batch = BlockEventArray.parse(s)
+    batchTime = (time.time() - start) / repeat
+
+    assert len(hits) == len(batch) == events
+    assert repr(hits[-1]) == repr(batch[-1])
+    print("%d events: list %.2fms, batched %.2fms (%.1fx)"%(
+        events, listTime * 1000, batchTime * 1000, listTime / batchTime))
+
+if __name__ == "__main__":
+    benchParseBlockHits()
@@ -0,0 +1,308 @@
+import os
+from itertools import groupby
+from .minecraft import Minecraft, intFloor
+
+""" Undo/redo journal for world edits.
+
+    EditJournal stands in for a Minecraft object. Before every setBlock,
+    setBlocks or setBlocksMany it reads the prior contents of the region
+    from the server and appends an entry to an append-only file. Any
+    number of steps can then be undone and redone:
+
+        mc = EditJournal(Minecraft.create(), "edits.journal")
+        mc.setBlocks(0, 0, 0, 20, 5, 20, block.STONE)
+        mc.undo()
+        mc.redo()
+
+    shapes.draw and BlockText write with setBlocksMany, so a whole shape
+    or text update is one step. Commands sent on conn directly are not
+    journaled.
+
+    Records are varint encoded. An edit stores its region origin as a
+    delta from the previous edit's origin, its size, the new block and
+    the prior block ids as runs of (length, id delta). A setBlocksMany
+    call is a group marker followed by its edits. Undo and redo are
+    appended as one byte markers, so reopening the file restores the
+    history. Only block ids are read back, so undo restores data values
+    as 0."""
+
+EDIT = 1
+UNDO = 2
+REDO = 3
+GROUP = 4
+
+
+def _zigzag(n):
+    return n << 1 if n >= 0 else ((-n) << 1) - 1
+
+def _unzigzag(n):
+    return n >> 1 if not n & 1 else -((n + 1) >> 1)
+
+def _putVarint(buf, n):
+    while n > 0x7f:
+        buf.append((n & 0x7f) | 0x80)
+        n >>= 7
+    buf.append(n)
+
+def _getVarint(buf, i):
+    """=> (value, next index)"""
+    n = 0
+    shift = 0
+    while True:
+        b = buf[i]
+        i += 1
+        n |= (b & 0x7f) << shift
+        if b < 0x80:
+            return n, i
+        shift += 7
+
+
+def runCuboids(start, end, nx, nz):
+    """Split the linear index range [start,end) of a box stored y, x, z
+    (z fastest) into as few cuboids (x0,y0,z0,x1,y1,z1) as possible"""
+    layer = nx * nz
+    i = start
+    while i < end:
+        y, rest = divmod(i, layer)
+        x, z = divmod(rest, nz)
+        if z or end - i < nz:
+            # part of a z row
+            z1 = min(nz, z + end - i) - 1
+            yield (x, y, z, x, y, z1)
+            i += z1 - z + 1
+        elif x or end - i < layer:
+            # whole z rows of one layer
+            rows = min(nx - x, (end - i) // nz)
+            yield (x, y, 0, x + rows - 1, y, nz - 1)
+            i += rows * nz
+        else:
+            # whole layers
+            layers = (end - i) // layer
+            yield (0, y, 0, nx - 1, y + layers - 1, nz - 1)
+            i += layers * layer
+
+
+class Edit:
+    """A decoded journal entry"""
+    def __init__(self, origin, size, block, runs):
+        self.origin = origin
+        self.size = size
+        self.block = block
+        self.runs = runs
+
+    def cuboid(self):
+        x, y, z = self.origin
+        nx, ny, nz = self.size
+        return [x, y, z, x + nx - 1, y + ny - 1, z + nz - 1]
+
+
+class EditJournal:
+    """Minecraft wrapper that journals block writes for undo/redo"""
+    def __init__(self, mc, path, cache=None):
+        """cache, if given, is read instead of the server for the prior
+        contents, e.g. a WorldQuery that is also passed as mc. It must
+        see every change: blocks changed by players or through other
+        objects make the journal record, and undo restore, wrong ids"""
+        self.mc = mc
+        self.source = cache if cache is not None else mc
+        # one step per undo: [[(offset, length, origin)]] of the edits
+        # in the current history
+        self.entries = []
+        # entries[:position] are applied
+        self.position = 0
+        self.lastOrigin = (0, 0, 0)
+        self.path = path
+        if os.path.exists(path):
+            self._load()
+        self.file = open(path, "ab+")
+
+    def __getattr__(self, name):
+        return getattr(self.mc, name)
+
+    def close(self):
+        self.file.close()
+
+    def _newStep(self):
+        del self.entries[self.position:]
+        self.entries.append([])
+        self.position += 1
+
+    def _load(self):
+        f = open(self.path, "rb")
+        data = bytearray(f.read())
+        f.close()
+        # edits still to come in the current group
+        group = 0
+        i = 0
+        while i < len(data):
+            kind = data[i]
+            i += 1
+            if kind == UNDO:
+                self.position -= 1
+            elif kind == REDO:
+                self.position += 1
+            elif kind == GROUP:
+                group, i = _getVarint(data, i)
+                self._newStep()
+            elif kind == EDIT:
+                length, i = _getVarint(data, i)
+                origin = self._decodeOrigin(data, i)
+                if group:
+                    group -= 1
+                else:
+                    self._newStep()
+                self.entries[-1].append((i, length, origin))
+                self.lastOrigin = origin
+                i += length
+            else:
+                raise ValueError("Corrupt journal %s at byte %d"%(
+                    self.path, i - 1))
+
+    def _decodeOrigin(self, buf, i):
+        d = []
+        for k in range(3):
+            v, i = _getVarint(buf, i)
+            d.append(_unzigzag(v))
+        return (self.lastOrigin[0] + d[0], self.lastOrigin[1] + d[1],
+                self.lastOrigin[2] + d[2])
+
+    def _record(self, x0, y0, z0, x1, y1, z1, block, before):
+        """Encode an edit record for the region and its prior ids
+        => (record, origin)"""
+        payload = bytearray()
+        origin = (x0, y0, z0)
+        for k in range(3):
+            _putVarint(payload, _zigzag(origin[k] - self.lastOrigin[k]))
+        for n in (x1 - x0 + 1, y1 - y0 + 1, z1 - z0 + 1):
+            _putVarint(payload, n)
+        _putVarint(payload, block[0])
+        _putVarint(payload, block[1] if len(block) > 1 else 0)
+        prev = 0
+        for id, run in groupby(before):
+            _putVarint(payload, sum(1 for _ in run))
+            _putVarint(payload, _zigzag(id - prev))
+            prev = id
+        self.lastOrigin = origin
+        return payload, origin
+
+    def _append(self, edits):
+        """Append [(payload, origin)] as one step"""
+        out = bytearray()
+        if len(edits) != 1:
+            out.append(GROUP)
+            _putVarint(out, len(edits))
+        self.file.seek(0, 2)
+        start = self.file.tell()
+        step = []
+        for payload, origin in edits:
+            out.append(EDIT)
+            _putVarint(out, len(payload))
+            step.append((start + len(out), len(payload), origin))
+            out += payload
+        self.file.write(out)
+        self._newStep()
+        self.entries[-1] = step
+
+    def _read(self, entry):
+        offset, length, origin = entry
+        self.file.flush()
+        self.file.seek(offset)
+        buf = bytearray(self.file.read(length))
+        i = 0
+        for k in range(3):
+            v, i = _getVarint(buf, i)
+        size = []
+        for k in range(3):
+            v, i = _getVarint(buf, i)
+            size.append(v)
+        id, i = _getVarint(buf, i)
+        data, i = _getVarint(buf, i)
+        runs = []
+        prev = 0
+        while i < len(buf):
+            n, i = _getVarint(buf, i)
+            d, i = _getVarint(buf, i)
+            prev += _unzigzag(d)
+            runs.append((n, prev))
+        return Edit(origin, size, (id, data), runs)
+
+    def _readBefore(self, cuboids):
+        """Prior ids of several sorted cuboids, pipelined when reading a
+        plain Minecraft => [[id]]"""
+        if isinstance(self.source, Minecraft):
+            replies = self.source.conn.sendReceiveMany(
+                [("world.getBlocks", c) for c in cuboids])
+            return [list(map(int, r.split(b","))) for r in replies]
+        return [self.source.getBlocks(c) for c in cuboids]
+
+    def setBlock(self, *args):
+        """Set block (x,y,z,id,[data]), journaled"""
+        args = intFloor(args)
+        x, y, z = args[:3]
+        before = [self.source.getBlock(x, y, z)]
+        self._append([self._record(x, y, z, x, y, z, args[3:], before)])
+        self.mc.setBlock(args)
+
+    def setBlocks(self, *args):
+        """Set a cuboid of blocks (x0,y0,z0,x1,y1,z1,id,[data]), journaled"""
+        self.setBlocksMany([args])
+
+    def setBlocksMany(self, cuboids):
+        """Set several cuboids [(x0,y0,z0,x1,y1,z1,id,[data])] as one
+        journaled step"""
+        cuboids = [intFloor(c) for c in cuboids]
+        if not cuboids:
+            return
+        regions = [(min(c[0], c[3]), min(c[1], c[4]), min(c[2], c[5]),
+                   max(c[0], c[3]), max(c[1], c[4]), max(c[2], c[5]))
+                  for c in cuboids]
+        # overlapping cuboids all record the ids from before the step;
+        # undoing them in reverse order still restores those
+        befores = self._readBefore(regions)
+        self._append([self._record(*(r + (c[6:], before)))
+                      for r, c, before in zip(regions, cuboids, befores)])
+        if len(cuboids) == 1:
+            self.mc.setBlocks(cuboids[0])
+        else:
+            self.mc.setBlocksMany(cuboids)
+
+    def canUndo(self):
+        return self.position > 0
+
+    def canRedo(self):
+        return self.position < len(self.entries)
+
+    def undo(self, steps=1):
+        """Undo the last steps steps. Returns the number undone"""
+        done = 0
+        while done < steps and self.canUndo():
+            cuboids = []
+            for entry in reversed(self.entries[self.position - 1]):
+                edit = self._read(entry)
+                ox, oy, oz = edit.origin
+                nx, ny, nz = edit.size
+                i = 0
+                for n, id in edit.runs:
+                    for c in runCuboids(i, i + n, nx, nz):
+                        cuboids.append((c[0] + ox, c[1] + oy, c[2] + oz,
+                                        c[3] + ox, c[4] + oy, c[5] + oz, id))
+                    i += n
+            # one batch, through self.mc so a wrapping cache sees it
+            self.mc.setBlocksMany(cuboids)
+            self.position -= 1
+            self.file.seek(0, 2)
+            self.file.write(bytearray([UNDO]))
+            done += 1
+        return done
+
+    def redo(self, steps=1):
+        """Redo the last steps undone steps. Returns the number redone"""
+        done = 0
+        while done < steps and self.canRedo():
+            edits = [self._read(e) for e in self.entries[self.position]]
+            self.mc.setBlocksMany([e.cuboid() + list(e.block) for e in edits])
+            self.position += 1
+            self.file.seek(0, 2)
+            self.file.write(bytearray([REDO]))
+            done += 1
+        return done
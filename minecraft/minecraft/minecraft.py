@@ -1,9 +1,10 @@
-from connection import Connection
-from vec3 import Vec3
-from event import BlockEvent
-from block import Block
+from .connection import Connection, ResilientConnection, SharedConnection, \
+    CoalescingConnection
+from .vec3 import Vec3
+from .event import BlockEvent, BlockEventArray
+from .block import Block
 import math
-from util import flatten
+from .util import flatten
 
 """ Minecraft PI low level api v0.1_1
 
@@ -29,8 +30,8 @@ class CmdPositioner:
 
     def getPos(self, id):
         """Get entity position (entityId:int) => Vec3"""
-        s = self.conn.sendReceive(self.pkg + ".getPos", id)
-        return Vec3(*map(float, s.split(",")))
+        s = self.conn.sendReceiveBytes(self.pkg + ".getPos", id)
+        return Vec3(*map(float, s.split(b",")))
 
     def setPos(self, id, *args):
         """Set entity position (entityId:int, x,y,z)"""
@@ -38,8 +39,8 @@ class CmdPositioner:
 
     def getTilePos(self, id):
         """Get entity tile position (entityId:int) => Vec3"""
-        s = self.conn.sendReceive(self.pkg + ".getTile", id)
-        return Vec3(*map(int, s.split(",")))
+        s = self.conn.sendReceiveBytes(self.pkg + ".getTile", id)
+        return Vec3(*map(int, s.split(b",")))
 
     def setTilePos(self, id, *args):
         """Set entity tile position (entityId:int) => Vec3"""
@@ -101,11 +102,16 @@ class CmdEvents:
         """Clear all old events"""
         self.conn.send("events.clear")
 
-    def pollBlockHits(self):
-        """Only triggered by sword => [BlockEvent]"""
-        s = self.conn.sendReceive("events.block.hits")
-        events = [e for e in s.split("|") if e]
-        return [BlockEvent.Hit(*map(int, e.split(","))) for e in events]
+    def pollBlockHits(self, batched=False):
+        """Only triggered by sword => [BlockEvent]
+
+        With batched=True the reply is parsed in one pass into a
+        BlockEventArray, which creates BlockEvents only when iterated"""
+        s = self.conn.sendReceiveBytes("events.block.hits")
+        if batched:
+            return BlockEventArray.parse(s)
+        events = [e for e in s.split(b"|") if e]
+        return [BlockEvent.Hit(*map(int, e.split(b","))) for e in events]
 
 
 class Minecraft:
@@ -120,18 +126,20 @@ class Minecraft:
 
     def getBlock(self, *args):
         """Get block (x,y,z) => id:int"""
-        return int(self.conn.sendReceive("world.getBlock", intFloor(args)))
+        return int(self.conn.sendReceiveBytes("world.getBlock", intFloor(args)))
 
     def getBlockWithData(self, *args):
         """Get block with data (x,y,z) => Block"""
-        ans = self.conn.sendReceive("world.getBlockWithData", intFloor(args))
-        return Block(*map(int, ans.split(",")))
-    """
-        @TODO
-    """
+        ans = self.conn.sendReceiveBytes("world.getBlockWithData", intFloor(args))
+        return Block(*map(int, ans.split(b",")))
+
     def getBlocks(self, *args):
-        """Get a cuboid of blocks (x0,y0,z0,x1,y1,z1) => [id:int]"""
-        return int(self.conn.sendReceive("world.getBlocks", intFloor(args)))
+        """Get a cuboid of blocks (x0,y0,z0,x1,y1,z1) => [id:int]
+
+        Ids are ordered by y, then x, then z (z varies fastest), from
+        the low corner. Needs a server that implements world.getBlocks"""
+        s = self.conn.sendReceiveBytes("world.getBlocks", intFloor(args))
+        return list(map(int, s.split(b",")))
 
     def setBlock(self, *args):
         """Set block (x,y,z,id,[data])"""
@@ -141,14 +149,19 @@ class Minecraft:
         """Set a cuboid of blocks (x0,y0,z0,x1,y1,z1,id,[data])"""
         self.conn.send("world.setBlocks", intFloor(args))
 
+    def setBlocksMany(self, cuboids):
+        """Set several cuboids [(x0,y0,z0,x1,y1,z1,id,[data])] in one write.
+        Wrappers override this, so batched writes go through them too"""
+        self.conn.sendMany([("world.setBlocks", intFloor(c)) for c in cuboids])
+
     def getHeight(self, *args):
         """Get the height of the world (x,z) => int"""
-        return int(self.conn.sendReceive("world.getHeight", intFloor(args)))
+        return int(self.conn.sendReceiveBytes("world.getHeight", intFloor(args)))
 
     def getPlayerEntityIds(self):
         """Get the entity ids of the connected players => [id:int]"""
-        ids = self.conn.sendReceive("world.getPlayerIds")
-        return map(int, ids.split("|"))
+        ids = self.conn.sendReceiveBytes("world.getPlayerIds")
+        return list(map(int, ids.split(b"|")))
 
     def saveCheckpoint(self):
         """Save a checkpoint that can be used for restoring the world"""
@@ -167,10 +180,26 @@ class Minecraft:
         self.conn.send("world.setting", setting, 1 if bool(status) else 0)
 
     @staticmethod
-    def create(address = "localhost", port = 4711):
-        return Minecraft(Connection(address, port))
-
-
+    def create(address = "localhost", port = 4711, reconnect = False,
+               coalesce = False, shared = False):
+        """Connect to Minecraft Pi. With reconnect=True the connection is
+        made on first use and re-established after drops. With
+        coalesce=True block writes are coalesced (CoalescingConnection).
+        With shared=True many threads can use it (SharedConnection)"""
+        if reconnect and shared:
+            raise ValueError("reconnect and shared can't be combined")
+        if reconnect:
+            conn = ResilientConnection(address, port)
+        elif shared:
+            conn = SharedConnection(address, port)
+        else:
+            conn = Connection(address, port)
+        if coalesce:
+            conn = CoalescingConnection(conn)
+        return Minecraft(conn)
+
+
+# Run with "python -m minecraft.minecraft" from the minecraft folder
 if __name__ == "__main__":
     mc = Minecraft.create()
     mc.postToChat("Hello, Minecraft!")
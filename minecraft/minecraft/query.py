@@ -0,0 +1,248 @@
+from array import array
+from collections import Counter, OrderedDict
+from .block import Block
+from .vec3 import Vec3
+from .minecraft import intFloor
+from .scanner import chunkCuboids, streamChunks, _tobytes
+
+""" Block queries over regions.
+
+    WorldQuery answers find/count/bounding box questions about a region
+    from bulk-fetched chunks (see scanner). Chunks lie on a fixed grid and
+    stay in an LRU cache, so overlapping queries reuse them, and every
+    chunk is searched with bytes.find/count rather than block by block:
+
+        q = WorldQuery(mc)
+        golds = q.find(-50, -10, -50, 50, 10, 50, block.GOLD_BLOCK)
+        air = q.count(-50, 1, -50, 50, 63, 50, block.AIR)
+
+    WorldQuery also stands in for the Minecraft object. Its setBlock,
+    setBlocks and setBlocksMany (used by shapes.draw, BlockText and
+    EditJournal) update the cached chunks. Writes made any other way,
+    e.g. on the wrapped object, on conn or by other players, are only
+    seen after invalidate(); restoreCheckpoint() invalidates by itself. With index=True it also keeps per-chunk counts
+    of every block id, so chunks without a wanted type are skipped and
+    counts over whole chunks need no scan. Only block ids are compared,
+    not data."""
+
+
+def _typeIds(blockTypes):
+    """Block types (Block, id or lists of them) => set of ids"""
+    ids = set()
+    for b in blockTypes:
+        if isinstance(b, Block):
+            ids.add(b.id)
+        elif isinstance(b, int):
+            ids.add(b)
+        else:
+            ids |= _typeIds(b)
+    return ids
+
+
+def _overlaps(c, x0, y0, z0, x1, y1, z1):
+    return (c[0] <= x1 and x0 <= c[3] and c[1] <= y1 and y0 <= c[4] and
+            c[2] <= z1 and z0 <= c[5])
+
+
+class WorldQuery:
+    """Find and count block types over regions of a Minecraft world"""
+    def __init__(self, mc, chunkSize=(32, 32, 32), cacheSize=256,
+                 index=False, prefetch=4, pipeline=2):
+        self.mc = mc
+        self.chunkSize = chunkSize
+        self.cacheSize = cacheSize
+        self.prefetch = prefetch
+        self.pipeline = pipeline
+        # chunk origin -> Chunk, least recently used first
+        self.cache = OrderedDict()
+        # with index: chunk origin -> Counter of ids,
+        # and id -> set of the chunk origins holding it
+        self.index = index
+        self.counts = {}
+        self.chunksWith = {}
+
+    def __getattr__(self, name):
+        return getattr(self.mc, name)
+
+    def invalidate(self):
+        """Forget all cached chunks"""
+        self.cache.clear()
+        self.counts.clear()
+        self.chunksWith.clear()
+
+    def _add(self, chunk):
+        key = chunk.origin
+        self.cache[key] = chunk
+        if self.index:
+            counts = self.counts[key] = Counter(bytearray(_tobytes(chunk.ids)))
+            for id in counts:
+                self.chunksWith.setdefault(id, set()).add(key)
+        while len(self.cache) > self.cacheSize:
+            old, chunk = self.cache.popitem(last=False)
+            for id in self.counts.pop(old, ()):
+                self.chunksWith[id].discard(old)
+
+    def _chunks(self, region, ids=None):
+        """Chunks overlapping a sorted region: the cached ones first, then
+        the rest as they arrive from the server. With an index, ids limits
+        the cached chunks to those holding any of them"""
+        missing = []
+        cached = []
+        for c in chunkCuboids(*(region + (self.chunkSize, True))):
+            chunk = self.cache.get(c[:3])
+            if chunk is None:
+                missing.append(c)
+            elif ids is None or not self.index or \
+                    any(c[:3] in self.chunksWith.get(id, ()) for id in ids):
+                cached.append(chunk)
+        for chunk in cached:
+            # refresh its place in the LRU order
+            del self.cache[chunk.origin]
+            self.cache[chunk.origin] = chunk
+            yield chunk
+        if missing:
+            for chunk in streamChunks(self.mc.conn, missing, self.prefetch,
+                                      self.pipeline):
+                self._add(chunk)
+                yield chunk
+
+    @staticmethod
+    def _region(args):
+        v = intFloor(args)
+        return (min(v[0], v[3]), min(v[1], v[4]), min(v[2], v[5]),
+                max(v[0], v[3]), max(v[1], v[4]), max(v[2], v[5]))
+
+    def find(self, x0, y0, z0, x1, y1, z1, *blockTypes):
+        """Positions of all blocks of the given types in a cuboid => [Vec3]"""
+        region = self._region((x0, y0, z0, x1, y1, z1))
+        ids = _typeIds(blockTypes)
+        found = []
+        for chunk in self._chunks(region, ids):
+            spans = chunk.spans(*region)
+            for id in ids:
+                for i in chunk.find(id, spans):
+                    found.append(Vec3(*chunk.position(i)))
+        return found
+
+    def count(self, x0, y0, z0, x1, y1, z1, *blockTypes):
+        """Number of blocks of the given types in a cuboid"""
+        region = self._region((x0, y0, z0, x1, y1, z1))
+        ids = _typeIds(blockTypes)
+        n = 0
+        for chunk in self._chunks(region, ids):
+            spans = chunk.spans(*region)
+            if self.index and spans == [(0, len(chunk.ids))]:
+                counts = self.counts[chunk.origin]
+                n += sum(counts[id] for id in ids)
+                continue
+            data = _tobytes(chunk.ids)
+            for id in ids:
+                needle = bytes(bytearray([id]))
+                for start, end in spans:
+                    n += data.count(needle, start, end)
+        return n
+
+    def histogram(self, x0, y0, z0, x1, y1, z1):
+        """Count every block type in a cuboid => {id: count}"""
+        region = self._region((x0, y0, z0, x1, y1, z1))
+        total = Counter()
+        for chunk in self._chunks(region):
+            spans = chunk.spans(*region)
+            if self.index and spans == [(0, len(chunk.ids))]:
+                total.update(self.counts[chunk.origin])
+                continue
+            data = _tobytes(chunk.ids)
+            for start, end in spans:
+                total.update(bytearray(data[start:end]))
+        return dict(total)
+
+    def bbox(self, x0, y0, z0, x1, y1, z1, *blockTypes):
+        """Bounding box of the blocks of the given types in a cuboid
+        => (Vec3 low corner, Vec3 high corner), or None if there are none"""
+        found = self.find(x0, y0, z0, x1, y1, z1, *blockTypes)
+        if not found:
+            return None
+        xs = [p.x for p in found]
+        ys = [p.y for p in found]
+        zs = [p.z for p in found]
+        return (Vec3(min(xs), min(ys), min(zs)), Vec3(max(xs), max(ys), max(zs)))
+
+    def getBlock(self, *args):
+        """Get block (x,y,z) => id:int, from the cache"""
+        x, y, z = intFloor(args)
+        for chunk in self._chunks((x, y, z, x, y, z)):
+            return chunk.get(x, y, z)
+
+    def getBlocks(self, *args):
+        """Get a cuboid of blocks (x0,y0,z0,x1,y1,z1) => [id:int], in the
+        order of Minecraft.getBlocks, from the cache"""
+        region = self._region(args)
+        x0, y0, z0, x1, y1, z1 = region
+        nx, nz = x1 - x0 + 1, z1 - z0 + 1
+        out = array("B", bytearray(nx * (y1 - y0 + 1) * nz))
+        for chunk in self._chunks(region):
+            ox, oy, oz = chunk.origin
+            cx, cy, cz = chunk.size
+            za, zb = max(z0, oz), min(z1, oz + cz - 1)
+            for y in range(max(y0, oy), min(y1, oy + cy - 1) + 1):
+                for x in range(max(x0, ox), min(x1, ox + cx - 1) + 1):
+                    src = chunk.index(x, y, za)
+                    dst = ((y - y0) * nx + x - x0) * nz + za - z0
+                    out[dst:dst + zb - za + 1] = \
+                        chunk.ids[src:src + zb - za + 1]
+        return out.tolist()
+
+    def setBlock(self, *args):
+        """Set block (x,y,z,id,[data]), updating the cache"""
+        args = intFloor(args)
+        self.mc.setBlock(args)
+        self._written(tuple(args[:3]) * 2, args[3])
+
+    def setBlocks(self, *args):
+        """Set a cuboid of blocks (x0,y0,z0,x1,y1,z1,id,[data]), updating
+        the cache"""
+        args = intFloor(args)
+        self.mc.setBlocks(args)
+        self._written(self._region(args[:6]), args[6])
+
+    def setBlocksMany(self, cuboids):
+        """Set several cuboids [(x0,y0,z0,x1,y1,z1,id,[data])] in one
+        write, updating the cache"""
+        cuboids = [intFloor(c) for c in cuboids]
+        self.mc.setBlocksMany(cuboids)
+        for c in cuboids:
+            self._written(self._region(c[:6]), c[6])
+
+    def restoreCheckpoint(self):
+        """Restore the world state to the checkpoint, dropping the cache"""
+        self.mc.restoreCheckpoint()
+        self.invalidate()
+
+    def _written(self, region, id):
+        """Apply a write of id over a sorted region to the cached chunks"""
+        x0, y0, z0, x1, y1, z1 = region
+        cx, cy, cz = self.chunkSize
+        cells = ((x1 // cx - x0 // cx + 1) * (y1 // cy - y0 // cy + 1) *
+                 (z1 // cz - z0 // cz + 1))
+        if cells <= len(self.cache):
+            # look the chunks on the grid up by origin
+            keys = [c[:3] for c in
+                    chunkCuboids(*(region + (self.chunkSize, True)))]
+            touched = [(k, self.cache[k]) for k in keys if k in self.cache]
+        else:
+            touched = [(k, c) for k, c in self.cache.items()
+                       if _overlaps(c.cuboid(), *region)]
+        for key, chunk in touched:
+            counts = self.counts.get(key)
+            for start, end in chunk.spans(*region):
+                if counts is not None:
+                    counts.subtract(bytearray(_tobytes(chunk.ids[start:end])))
+                    counts[id] += end - start
+                chunk.ids[start:end] = array("B", [id]) * (end - start)
+            if counts is not None:
+                for i in list(counts):
+                    if counts[i] > 0:
+                        self.chunksWith.setdefault(i, set()).add(key)
+                    else:
+                        del counts[i]
+                        self.chunksWith[i].discard(key)
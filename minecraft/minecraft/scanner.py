@@ -0,0 +1,181 @@
+import threading
+from array import array
+try:
+    from queue import Queue
+except ImportError:
+    from Queue import Queue
+
+""" Chunked scanning of large regions.
+
+    RegionScanner walks a cuboid in chunks, fetching each with
+    world.getBlocks. A background worker pipelines the requests for the
+    next chunks while the caller works on the current one; at most
+    prefetch chunks wait in memory. Chunks come out as Chunk objects
+    holding an array('B') of ids:
+
+        for chunk in RegionScanner(mc, 0, 0, 0, 255, 63, 255):
+            for i in chunk.find(block.GOLD_BLOCK.id):
+                print(chunk.position(i))
+
+    The worker shares the connection with the caller, so the caller must
+    not use it during the scan unless it is a SharedConnection."""
+
+
+def _tobytes(ids):
+    return ids.tostring() if str is bytes else ids.tobytes()
+
+
+class Chunk:
+    """Block ids of a cuboid, ordered y, x, z (z fastest) like getBlocks"""
+    def __init__(self, x, y, z, nx, ny, nz, ids):
+        self.origin = (x, y, z)
+        self.size = (nx, ny, nz)
+        self.ids = ids
+
+    def cuboid(self):
+        x, y, z = self.origin
+        nx, ny, nz = self.size
+        return (x, y, z, x + nx - 1, y + ny - 1, z + nz - 1)
+
+    def index(self, x, y, z):
+        ox, oy, oz = self.origin
+        nx, ny, nz = self.size
+        return ((y - oy) * nx + (x - ox)) * nz + (z - oz)
+
+    def get(self, x, y, z):
+        """Block id at world position (x,y,z)"""
+        return self.ids[self.index(x, y, z)]
+
+    def position(self, i):
+        """World position of index i => (x,y,z)"""
+        nx, ny, nz = self.size
+        y, rest = divmod(i, nx * nz)
+        x, z = divmod(rest, nz)
+        return (self.origin[0] + x, self.origin[1] + y, self.origin[2] + z)
+
+    def spans(self, x0, y0, z0, x1, y1, z1):
+        """Index ranges [(start,end)] of the blocks inside a cuboid, each
+        as long as the chunk's layout allows"""
+        ox, oy, oz = self.origin
+        nx, ny, nz = self.size
+        lx0, lx1 = max(min(x0, x1) - ox, 0), min(max(x0, x1) - ox, nx - 1)
+        ly0, ly1 = max(min(y0, y1) - oy, 0), min(max(y0, y1) - oy, ny - 1)
+        lz0, lz1 = max(min(z0, z1) - oz, 0), min(max(z0, z1) - oz, nz - 1)
+        if lx0 > lx1 or ly0 > ly1 or lz0 > lz1:
+            return []
+        if lz0 == 0 and lz1 == nz - 1:
+            if lx0 == 0 and lx1 == nx - 1:
+                return [(ly0 * nx * nz, (ly1 + 1) * nx * nz)]
+            return [((y * nx + lx0) * nz, (y * nx + lx1 + 1) * nz)
+                    for y in range(ly0, ly1 + 1)]
+        return [((y * nx + x) * nz + lz0, (y * nx + x) * nz + lz1 + 1)
+                for y in range(ly0, ly1 + 1) for x in range(lx0, lx1 + 1)]
+
+    def find(self, id, spans=None):
+        """Indices of all blocks with an id (in spans, if given), found
+        with bytes.find"""
+        data = _tobytes(self.ids)
+        needle = bytes(bytearray([id]))
+        for start, end in spans or [(0, len(data))]:
+            i = data.find(needle, start, end)
+            while i >= 0:
+                yield i
+                i = data.find(needle, i + 1, end)
+
+    def __repr__(self):
+        return "Chunk(%d,%d,%d, %dx%dx%d)"%(self.origin + self.size)
+
+
+def chunkCuboids(x0, y0, z0, x1, y1, z1, chunkSize, align=False):
+    """Split a cuboid into chunk cuboids, in y, x, z order. With align the
+    chunks are whole cells of a grid of chunkSize from 0,0,0, so they can
+    stick out of the cuboid"""
+    x0, x1 = min(x0, x1), max(x0, x1)
+    y0, y1 = min(y0, y1), max(y0, y1)
+    z0, z1 = min(z0, z1), max(z0, z1)
+    cx, cy, cz = chunkSize
+    if align:
+        x0, y0, z0 = x0 - x0 % cx, y0 - y0 % cy, z0 - z0 % cz
+        x1, y1, z1 = (x1 - x1 % cx + cx - 1, y1 - y1 % cy + cy - 1,
+                      z1 - z1 % cz + cz - 1)
+    for y in range(y0, y1 + 1, cy):
+        for x in range(x0, x1 + 1, cx):
+            for z in range(z0, z1 + 1, cz):
+                yield (x, y, z, min(x + cx - 1, x1), min(y + cy - 1, y1),
+                       min(z + cz - 1, z1))
+
+
+def fetchChunks(conn, cuboids):
+    """Fetch several chunk cuboids with pipelined getBlocks => [Chunk]"""
+    replies = conn.sendReceiveMany([("world.getBlocks", c) for c in cuboids])
+    chunks = []
+    for c, reply in zip(cuboids, replies):
+        ids = array("B", map(int, reply.split(b",")))
+        chunks.append(Chunk(c[0], c[1], c[2], c[3] - c[0] + 1,
+                            c[4] - c[1] + 1, c[5] - c[2] + 1, ids))
+    return chunks
+
+
+def _fetchAll(conn, cuboids, pipeline, out, stop):
+    try:
+        group = []
+        for c in cuboids:
+            group.append(c)
+            if len(group) == pipeline:
+                for chunk in fetchChunks(conn, group):
+                    if stop.is_set():
+                        return
+                    out.put(chunk)
+                group = []
+        if group and not stop.is_set():
+            for chunk in fetchChunks(conn, group):
+                out.put(chunk)
+    except Exception as e:
+        out.put(e)
+    out.put(None)
+
+
+def streamChunks(conn, cuboids, prefetch=4, pipeline=2):
+    """Fetch chunk cuboids on a background thread, pipeline per round
+    trip, and yield them in order with at most prefetch waiting"""
+    out = Queue(max(1, prefetch))
+    stop = threading.Event()
+    worker = threading.Thread(target=_fetchAll,
+                              args=(conn, cuboids, max(1, pipeline), out, stop))
+    worker.daemon = True
+    worker.start()
+    try:
+        while True:
+            chunk = out.get()
+            if chunk is None:
+                break
+            if isinstance(chunk, Exception):
+                raise chunk
+            yield chunk
+    finally:
+        # unblock the worker if the caller stopped early
+        stop.set()
+        while worker.is_alive():
+            while not out.empty():
+                out.get()
+            worker.join(0.01)
+
+
+class RegionScanner:
+    """Iterates over a region chunk by chunk, fetching ahead"""
+    def __init__(self, mc, x0, y0, z0, x1, y1, z1, chunkSize=(32, 32, 32),
+                 prefetch=4, pipeline=2):
+        self.conn = mc.conn
+        self.region = (x0, y0, z0, x1, y1, z1)
+        self.chunkSize = chunkSize
+        # chunks waiting for the caller
+        self.prefetch = prefetch
+        # chunks requested per round trip
+        self.pipeline = pipeline
+
+    def cuboids(self):
+        return chunkCuboids(*(self.region + (self.chunkSize,)))
+
+    def __iter__(self):
+        return streamChunks(self.conn, self.cuboids(), self.prefetch,
+                            self.pipeline)
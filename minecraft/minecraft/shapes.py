@@ -0,0 +1,250 @@
+import math
+from array import array
+from multiprocessing import Pool
+from .util import flatten
+
+""" Client side voxelization of geometric primitives.
+
+    Every shape function returns an array('i') of cuboids, six ints
+    (x0,y0,z0,x1,y1,z1) each, made of runs along x that are merged along
+    z where possible. That feeds straight into setBlocks:
+
+        draw(mc, sphere(0, 20, 0, 10), block.GLASS)
+
+    Shapes are computed row by row (one sqrt per row, not per block), so a
+    solid sphere of radius 100 is about 40k rows. Many or huge shapes can
+    be spread over a process pool with voxelizeAll()."""
+
+
+def _isqrt(n):
+    return int(math.sqrt(n))
+
+
+class _Rows:
+    """Collects x spans per (y,z) row and emits merged cuboids"""
+    def __init__(self):
+        self.rows = {}
+
+    def add(self, y, z, x0, x1):
+        self.rows.setdefault((y, z), []).append((x0, x1))
+
+    def cuboids(self, y1=None):
+        """Merge spans into cuboids. y1, if given, extrudes every row from
+        its y up to y1 (inclusive)"""
+        out = array("i")
+        # union overlapping spans of each row
+        spans = {}
+        for key, row in self.rows.items():
+            row.sort()
+            merged = [list(row[0])]
+            for x0, x1 in row[1:]:
+                if x0 <= merged[-1][1] + 1:
+                    merged[-1][1] = max(merged[-1][1], x1)
+                else:
+                    merged.append([x0, x1])
+            for x0, x1 in merged:
+                spans.setdefault((key[0], x0, x1), []).append(key[1])
+        # merge identical spans in consecutive z
+        for (y, x0, x1), zs in sorted(spans.items()):
+            zs.sort()
+            top = y if y1 is None else y1
+            start = prev = zs[0]
+            for z in zs[1:]:
+                if z != prev + 1:
+                    out.extend((x0, y, start, x1, top, prev))
+                    start = z
+                prev = z
+            out.extend((x0, y, start, x1, top, prev))
+        return out
+
+
+def _swap(cubs, a, b):
+    """Swap two axes (0=x,1=y,2=z) of a cuboid array in place"""
+    for i in range(0, len(cubs), 6):
+        cubs[i+a], cubs[i+b] = cubs[i+b], cubs[i+a]
+        cubs[i+3+a], cubs[i+3+b] = cubs[i+3+b], cubs[i+3+a]
+    return cubs
+
+
+def line(x0, y0, z0, x1, y1, z1):
+    """Voxel line between two points (3D Bresenham)"""
+    x0, y0, z0, x1, y1, z1 = [int(math.floor(v)) for v in
+                              (x0, y0, z0, x1, y1, z1)]
+    rows = _Rows()
+    d = [abs(x1 - x0), abs(y1 - y0), abs(z1 - z0)]
+    s = [1 if x1 >= x0 else -1, 1 if y1 >= y0 else -1,
+         1 if z1 >= z0 else -1]
+    p = [x0, y0, z0]
+    # drive along the longest axis
+    m = d.index(max(d))
+    a, b = [i for i in range(3) if i != m]
+    ea = 2 * d[a] - d[m]
+    eb = 2 * d[b] - d[m]
+    for i in range(d[m] + 1):
+        rows.add(p[1], p[2], p[0], p[0])
+        if ea > 0:
+            p[a] += s[a]
+            ea -= 2 * d[m]
+        if eb > 0:
+            p[b] += s[b]
+            eb -= 2 * d[m]
+        ea += 2 * d[a]
+        eb += 2 * d[b]
+        p[m] += s[m]
+    return rows.cuboids()
+
+
+def sphere(cx, cy, cz, r, hollow=False, ylo=None, yhi=None):
+    """Sphere of radius r. ylo/yhi limit the slab of rows produced (used
+    to split one big sphere over several processes)"""
+    cx, cy, cz = int(cx), int(cy), int(cz)
+    ri = int(r)
+    rr = r * r
+    inner = (r - 1) * (r - 1)
+    lo = -ri if ylo is None else max(-ri, ylo - cy)
+    hi = ri if yhi is None else min(ri, yhi - cy)
+    rows = _Rows()
+    for y in range(lo, hi + 1):
+        for z in range(-ri, ri + 1):
+            d = rr - y*y - z*z
+            if d < 0:
+                continue
+            dx = _isqrt(d)
+            di = inner - y*y - z*z
+            if not hollow or di < 0:
+                rows.add(cy + y, cz + z, cx - dx, cx + dx)
+            else:
+                dxi = _isqrt(di)
+                if dxi >= dx:
+                    continue
+                rows.add(cy + y, cz + z, cx - dx, cx - dxi - 1)
+                rows.add(cy + y, cz + z, cx + dxi + 1, cx + dx)
+    return rows.cuboids()
+
+
+def cylinder(cx, cy, cz, r, length, hollow=False, axis="y"):
+    """Cylinder of radius r whose base is centred on (cx,cy,cz) and which
+    extends length blocks along +axis ("x", "y" or "z")"""
+    cx, cy, cz = int(cx), int(cy), int(cz)
+    # build it along y around the origin, then rotate and move it
+    ri = int(r)
+    rr = r * r
+    inner = (r - 1) * (r - 1)
+    rows = _Rows()
+    for z in range(-ri, ri + 1):
+        d = rr - z*z
+        if d < 0:
+            continue
+        dx = _isqrt(d)
+        di = inner - z*z
+        if not hollow or di < 0:
+            rows.add(0, z, -dx, dx)
+        else:
+            dxi = _isqrt(di)
+            if dxi >= dx:
+                continue
+            rows.add(0, z, -dx, -dxi - 1)
+            rows.add(0, z, dxi + 1, dx)
+    cubs = rows.cuboids(y1=length - 1)
+    if axis == "x":
+        _swap(cubs, 0, 1)
+    elif axis == "z":
+        _swap(cubs, 1, 2)
+    return translate(cubs, cx, cy, cz)
+
+
+def _polygonRows(points):
+    """Fill a closed polygon [(x,z)] => _Rows at y=0. Block centres inside
+    the polygon are filled and its outline is always included"""
+    points = [(float(x), float(z)) for x, z in points]
+    rows = _Rows()
+    zs = [p[1] for p in points]
+    n = len(points)
+    for z in range(int(math.floor(min(zs))), int(math.ceil(max(zs))) + 1):
+        xs = []
+        for i in range(n):
+            xa, za = points[i]
+            xb, zb = points[(i + 1) % n]
+            if min(za, zb) <= z < max(za, zb):
+                xs.append(xa + (z - za) * (xb - xa) / (zb - za))
+        xs.sort()
+        for i in range(0, len(xs) - 1, 2):
+            x0 = int(math.ceil(xs[i]))
+            x1 = int(math.floor(xs[i + 1]))
+            if x0 <= x1:
+                rows.add(0, z, x0, x1)
+    for i in range(n):
+        xa, za = points[i]
+        xb, zb = points[(i + 1) % n]
+        edge = line(xa, 0, za, xb, 0, zb)
+        for j in range(0, len(edge), 6):
+            for z in range(edge[j+2], edge[j+5] + 1):
+                rows.add(0, z, edge[j], edge[j+3])
+    return rows
+
+
+def polygon(points, y):
+    """Filled polygon [(x,z)] lying flat at height y"""
+    return translate(_polygonRows(points).cuboids(), 0, int(y), 0)
+
+
+def prism(points, y0, y1):
+    """Polygon [(x,z)] extruded from y0 up to y1 (inclusive)"""
+    y0, y1 = int(min(y0, y1)), int(max(y0, y1))
+    return translate(_polygonRows(points).cuboids(y1=y1 - y0), 0, y0, 0)
+
+
+def translate(cubs, dx, dy, dz):
+    """Move a cuboid array in place"""
+    for i in range(0, len(cubs), 6):
+        cubs[i] += dx
+        cubs[i+1] += dy
+        cubs[i+2] += dz
+        cubs[i+3] += dx
+        cubs[i+4] += dy
+        cubs[i+5] += dz
+    return cubs
+
+
+def blockCount(cubs):
+    """Number of blocks covered by a cuboid array"""
+    n = 0
+    for i in range(0, len(cubs), 6):
+        n += ((cubs[i+3] - cubs[i] + 1) * (cubs[i+4] - cubs[i+1] + 1) *
+              (cubs[i+5] - cubs[i+2] + 1))
+    return n
+
+
+def _voxelize(job):
+    func, args = job[0], job[1]
+    kwargs = job[2] if len(job) > 2 else {}
+    return func(*args, **kwargs)
+
+
+def voxelizeAll(jobs, processes=None):
+    """Voxelize [(shapeFunction, args, [kwargs])] on a process pool and
+    concatenate the results => array('i'). A single big sphere can be
+    split into slabs:
+
+        jobs = [(sphere, (0, 0, 0, 100), {"ylo": y, "yhi": y + 49})
+                for y in range(-100, 101, 50)]"""
+    pool = Pool(processes)
+    try:
+        parts = pool.map(_voxelize, jobs)
+    finally:
+        pool.close()
+        pool.join()
+    out = array("i")
+    for part in parts:
+        out.extend(part)
+    return out
+
+
+def draw(mc, cubs, *blockType):
+    """Write a cuboid array with setBlocks, batched into few writes"""
+    blockType = list(flatten(blockType))
+    batch = 512
+    for start in range(0, len(cubs), 6 * batch):
+        end = min(len(cubs), start + 6 * batch)
+        mc.setBlocksMany([cubs[i:i+6].tolist() + blockType
+                          for i in range(start, end, 6)])
@@ -0,0 +1,233 @@
+from .util import flatten
+
+""" Block font text rendering.
+
+    Draws strings in a 3x5 pixel font, each pixel scale x scale blocks.
+    Glyphs are compiled once into column bitmasks and merged pixel
+    rectangles and cached. After the first draw, update() only sends the
+    pixels that differ from the previous frame, merged into runs.
+
+    Example:
+        banner = BlockText(mc, 0, 10, 20, block.GOLD_BLOCK, block.AIR)
+        banner.update("HELLO")
+        banner.scroll("A LONG SCROLLING MESSAGE", offset, 40)"""
+
+GLYPH_WIDTH = 3
+GLYPH_HEIGHT = 5
+SPACING = 1
+
+# Rows are listed top to bottom, '#' is a lit pixel.
+# Lower case letters are drawn with the upper case glyphs.
+FONT = {
+    " ": ("...", "...", "...", "...", "..."),
+    "A": (".#.", "#.#", "###", "#.#", "#.#"),
+    "B": ("##.", "#.#", "##.", "#.#", "##."),
+    "C": (".##", "#..", "#..", "#..", ".##"),
+    "D": ("##.", "#.#", "#.#", "#.#", "##."),
+    "E": ("###", "#..", "##.", "#..", "###"),
+    "F": ("###", "#..", "##.", "#..", "#.."),
+    "G": (".##", "#..", "#.#", "#.#", ".##"),
+    "H": ("#.#", "#.#", "###", "#.#", "#.#"),
+    "I": ("###", ".#.", ".#.", ".#.", "###"),
+    "J": ("..#", "..#", "..#", "#.#", ".#."),
+    "K": ("#.#", "#.#", "##.", "#.#", "#.#"),
+    "L": ("#..", "#..", "#..", "#..", "###"),
+    "M": ("#.#", "###", "###", "#.#", "#.#"),
+    "N": ("##.", "#.#", "#.#", "#.#", "#.#"),
+    "O": (".#.", "#.#", "#.#", "#.#", ".#."),
+    "P": ("##.", "#.#", "##.", "#..", "#.."),
+    "Q": (".#.", "#.#", "#.#", "##.", ".##"),
+    "R": ("##.", "#.#", "##.", "#.#", "#.#"),
+    "S": (".##", "#..", ".#.", "..#", "##."),
+    "T": ("###", ".#.", ".#.", ".#.", ".#."),
+    "U": ("#.#", "#.#", "#.#", "#.#", "###"),
+    "V": ("#.#", "#.#", "#.#", "#.#", ".#."),
+    "W": ("#.#", "#.#", "###", "###", "#.#"),
+    "X": ("#.#", "#.#", ".#.", "#.#", "#.#"),
+    "Y": ("#.#", "#.#", ".#.", ".#.", ".#."),
+    "Z": ("###", "..#", ".#.", "#..", "###"),
+    "0": ("###", "#.#", "#.#", "#.#", "###"),
+    "1": (".#.", "##.", ".#.", ".#.", "###"),
+    "2": ("##.", "..#", ".#.", "#..", "###"),
+    "3": ("##.", "..#", ".#.", "..#", "##."),
+    "4": ("#.#", "#.#", "###", "..#", "..#"),
+    "5": ("###", "#..", "##.", "..#", "##."),
+    "6": (".##", "#..", "###", "#.#", "###"),
+    "7": ("###", "..#", ".#.", ".#.", ".#."),
+    "8": ("###", "#.#", "###", "#.#", "###"),
+    "9": ("###", "#.#", "###", "..#", "##."),
+    ".": ("...", "...", "...", "...", ".#."),
+    ",": ("...", "...", "...", ".#.", "#.."),
+    "!": (".#.", ".#.", ".#.", "...", ".#."),
+    "?": ("##.", "..#", ".#.", "...", ".#."),
+    "-": ("...", "...", "###", "...", "..."),
+    "+": ("...", ".#.", "###", ".#.", "..."),
+    "=": ("...", "###", "...", "###", "..."),
+    ":": ("...", ".#.", "...", ".#.", "..."),
+    "/": ("..#", "..#", ".#.", "#..", "#.."),
+    "'": (".#.", ".#.", "...", "...", "..."),
+    '"': ("#.#", "#.#", "...", "...", "..."),
+    "(": ("..#", ".#.", ".#.", ".#.", "..#"),
+    ")": ("#..", ".#.", ".#.", ".#.", "#.."),
+    "<": ("..#", ".#.", "#..", ".#.", "..#"),
+    ">": ("#..", ".#.", "..#", ".#.", "#.."),
+    "*": ("#.#", ".#.", "#.#", "...", "..."),
+    "_": ("...", "...", "...", "...", "###"),
+    "%": ("#.#", "..#", ".#.", "#..", "#.#"),
+    "#": ("#.#", "###", "#.#", "###", "#.#"),
+}
+
+# Directions for the along/up vectors
+X = (1, 0, 0)
+Y = (0, 1, 0)
+Z = (0, 0, 1)
+
+
+class Glyph:
+    """A compiled glyph: column bitmasks (bit 0 is the bottom row) and
+    lit pixels merged into rectangles (c0,r0,c1,r1)"""
+    def __init__(self, rows):
+        height = len(rows)
+        self.columns = []
+        for c in range(len(rows[0])):
+            mask = 0
+            for r in range(height):
+                if rows[height - 1 - r][c] == "#":
+                    mask |= 1 << r
+            self.columns.append(mask)
+        self.rects = _mergeRects(self.columns, height)
+
+
+_glyphs = {}
+
+def glyph(char):
+    """Compiled glyph for a character, cached"""
+    g = _glyphs.get(char)
+    if g is None:
+        rows = FONT.get(char) or FONT.get(char.upper()) or FONT["?"]
+        g = _glyphs[char] = Glyph(rows)
+    return g
+
+
+def columns(text):
+    """Column bitmasks of a string, including the spacing columns"""
+    cols = []
+    gap = [0] * SPACING
+    for char in text:
+        cols.extend(glyph(char).columns)
+        cols.extend(gap)
+    return cols
+
+
+def _mergeRects(cols, height):
+    """Lit pixels of column bitmasks => [(c0,r0,c1,r1)]. Vertical runs in
+    each column, merged with identical runs in the next columns"""
+    runs = []
+    for c, mask in enumerate(cols):
+        r = 0
+        while r < height:
+            if mask >> r & 1:
+                start = r
+                while r < height and mask >> r & 1:
+                    r += 1
+                runs.append((start, r - 1, c))
+            else:
+                r += 1
+    runs.sort()
+    rects = []
+    for r0, r1, c in runs:
+        if rects and rects[-1][1] == r0 and rects[-1][3] == r1 \
+                and rects[-1][2] == c - 1:
+            rects[-1][2] = c
+        else:
+            rects.append([c, r0, c, r1])
+    return [tuple(rect) for rect in rects]
+
+
+class BlockText:
+    """Text drawn into the world at (x,y,z), the bottom left pixel.
+
+    along is the direction the text advances in and up the direction of
+    its top (axis unit vectors, e.g. X, Z or (-1,0,0)); text on the
+    floor uses up=Z."""
+    def __init__(self, mc, x, y, z, textBlock, backgroundBlock,
+                 scale=1, along=X, up=Y):
+        self.mc = mc
+        self.origin = (int(x), int(y), int(z))
+        self.textBlock = list(flatten([textBlock]))
+        self.backgroundBlock = list(flatten([backgroundBlock]))
+        self.scale = scale
+        self.along = along
+        self.up = up
+        self.frame = []
+
+    def _cuboid(self, c0, r0, c1, r1):
+        """Pixel rectangle => world cuboid [x0,y0,z0,x1,y1,z1]"""
+        s = self.scale
+        a0, a1 = c0 * s, (c1 + 1) * s - 1
+        u0, u1 = r0 * s, (r1 + 1) * s - 1
+        o, a, u = self.origin, self.along, self.up
+        return [o[i] + a[i]*a0 + u[i]*u0 for i in range(3)] + \
+               [o[i] + a[i]*a1 + u[i]*u1 for i in range(3)]
+
+    def _send(self, rects):
+        """Send [(c0,r0,c1,r1,on)] as one batch of setBlocks"""
+        if rects:
+            self.mc.setBlocksMany([self._cuboid(c0, r0, c1, r1) +
+                                   (self.textBlock if on
+                                    else self.backgroundBlock)
+                                   for c0, r0, c1, r1, on in rects])
+
+    def draw(self, text):
+        """Draw text from scratch: background, then the cached glyph
+        rectangles. The background also covers the previous frame"""
+        cols = columns(text)
+        n = max(len(cols), len(self.frame))
+        cols = cols + [0] * (n - len(cols))
+        rects = []
+        if n:
+            rects.append((0, 0, n - 1, GLYPH_HEIGHT - 1, False))
+        width = GLYPH_WIDTH + SPACING
+        for i, char in enumerate(text):
+            for c0, r0, c1, r1 in glyph(char).rects:
+                rects.append((c0 + i*width, r0, c1 + i*width, r1, True))
+        self._send(rects)
+        self.frame = cols
+
+    def showColumns(self, cols):
+        """Show a frame of column bitmasks, sending only changed pixels"""
+        old = self.frame
+        n = max(len(old), len(cols))
+        old = old + [0] * (n - len(old))
+        new = list(cols) + [0] * (n - len(cols))
+        changed = [o ^ c for o, c in zip(old, new)]
+        rects = []
+        for r in range(GLYPH_HEIGHT):
+            bit = 1 << r
+            c = 0
+            while c < n:
+                if changed[c] & bit:
+                    on = new[c] & bit
+                    start = c
+                    c += 1
+                    while c < n and changed[c] & bit and \
+                            (new[c] & bit) == on:
+                        c += 1
+                    rects.append((start, r, c - 1, r, bool(on)))
+                else:
+                    c += 1
+        self._send(rects)
+        self.frame = new
+
+    def update(self, text):
+        """Change the text, sending only the differences"""
+        self.showColumns(columns(text))
+
+    def scroll(self, text, offset, width):
+        """Show the width columns of text starting at column offset. The
+        text wraps around, so increasing offset scrolls it"""
+        cols = columns(text)
+        if not cols:
+            return self.showColumns([0] * width)
+        n = len(cols)
+        self.showColumns([cols[(offset + i) % n] for i in range(width)])
@@ -0,0 +1,140 @@
+import threading
+import time
+from array import array
+
+""" Polls entity positions at a fixed rate.
+
+    All getPos requests of one poll go out in a single write
+    (Connection.sendReceiveMany), so tracking N entities costs one round
+    trip per tick instead of N. Only the latest position per entity is
+    kept as a tuple; the history is a fixed size ring buffer of doubles.
+
+    Example:
+        tracker = PositionTracker(mc, [None] + mc.getPlayerEntityIds())
+        tracker.onMove(lambda id, x, y, z: ...)
+        tracker.start()
+
+    None stands for the host player (player.getPos)."""
+
+
+class PositionHistory:
+    """Fixed size ring buffer of (x,y,z) samples stored as doubles"""
+    def __init__(self, size):
+        self.size = size
+        self.data = array("d", [0.0]) * (3 * size)
+        self.count = 0
+
+    def append(self, x, y, z):
+        i = (self.count % self.size) * 3
+        self.data[i] = x
+        self.data[i+1] = y
+        self.data[i+2] = z
+        self.count += 1
+
+    def __len__(self):
+        return min(self.count, self.size)
+
+    def __iter__(self):
+        """Oldest to newest sample"""
+        n = len(self)
+        start = self.count - n
+        for k in range(start, self.count):
+            i = (k % self.size) * 3
+            yield (self.data[i], self.data[i+1], self.data[i+2])
+
+
+class PositionTracker:
+    """Tracks the positions of a set of entities"""
+    def __init__(self, mc, entityIds, interval=0.05, threshold=0.1,
+                 historySize=256):
+        self.conn = mc.conn
+        self.interval = interval
+        self.threshold = threshold
+        self.historySize = historySize
+        self.callbacks = []
+        # last polled and last reported (moved) position per entity
+        self.last = {}
+        self.reported = {}
+        self.history = {}
+        self._thread = None
+        self._running = False
+        self.setEntities(entityIds)
+
+    def setEntities(self, entityIds):
+        """Set the entity ids to track (None is the host player)"""
+        entityIds = list(entityIds)
+        calls = [("player.getPos",) if id is None else ("entity.getPos", id)
+                 for id in entityIds]
+        for id in entityIds:
+            if id not in self.history:
+                self.history[id] = PositionHistory(self.historySize)
+        # swapped in as one tuple, so a poll running on the background
+        # thread sees either the old or the new set, never a mix
+        self.entities = (entityIds, calls)
+
+    def onMove(self, callback):
+        """Register callback(entityId, x, y, z), fired when an entity
+        moved further than threshold since its last reported position"""
+        self.callbacks.append(callback)
+
+    def getPos(self, id):
+        """Last polled position of an entity => (x,y,z) or None"""
+        return self.last.get(id)
+
+    def poll(self):
+        """Poll all entities once. Returns the ids that moved"""
+        entityIds, calls = self.entities
+        if not calls:
+            return []
+        replies = self.conn.sendReceiveMany(calls)
+        moved = []
+        limit = self.threshold * self.threshold
+        for id, s in zip(entityIds, replies):
+            x, y, z = map(float, s.split(b","))
+            self.history[id].append(x, y, z)
+            self.last[id] = (x, y, z)
+            prev = self.reported.get(id)
+            if prev is not None:
+                dx = x - prev[0]
+                dy = y - prev[1]
+                dz = z - prev[2]
+                if dx*dx + dy*dy + dz*dz <= limit:
+                    continue
+            self.reported[id] = (x, y, z)
+            moved.append(id)
+            for callback in self.callbacks:
+                callback(id, x, y, z)
+        return moved
+
+    def run(self):
+        """Poll every interval seconds until stop() is called"""
+        self._running = True
+        self._loop()
+
+    def _loop(self):
+        next = time.time()
+        while self._running:
+            self.poll()
+            next += self.interval
+            delay = next - time.time()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                # fell behind; don't try to catch up with a burst
+                next = time.time()
+
+    def start(self):
+        """Run the poll loop on a background thread. Other threads may
+        only use the connection meanwhile if it is a SharedConnection"""
+        if self._thread is not None:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._loop)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
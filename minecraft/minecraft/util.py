@@ -1,8 +1,16 @@
-import collections
+try:
+    from collections.abc import Iterable
+except ImportError:
+    from collections import Iterable
+
+try:
+    _stringTypes = (basestring, bytes, bytearray)
+except NameError:
+    _stringTypes = (str, bytes, bytearray)
 
 def flatten(l):
     for e in l:
-        if isinstance(e, collections.Iterable) and not isinstance(e, basestring):
+        if isinstance(e, Iterable) and not isinstance(e, _stringTypes):
             for ee in flatten(e): yield ee
         else: yield e
 
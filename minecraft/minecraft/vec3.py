@@ -55,6 +55,12 @@ class Vec3:
         self.y = func(self.y)
         self.z = func(self.z)
 
+    def __eq__(self, rhs):
+        return self.x == rhs.x and self.y == rhs.y and self.z == rhs.z
+
+    def __ne__(self, rhs):
+        return not self.__eq__(rhs)
+
     def __cmp__(self, rhs):
         dx = self.x - rhs.x
         if dx != 0: return dx